@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Deploy artifact builder
+Streams a directory into a reproducible zip or tar.gz, written to disk or
+handed to an uploader in fixed-size chunks, without holding the archive in
+memory
+"""
+
+import argparse
+import gzip
+import hashlib
+import io
+import tarfile
+import zipfile
+from pathlib import Path
+
+import atomic_files
+
+ARCHIVE_FORMATS = ("zip", "tar.gz")
+
+CHUNK_SIZE = 1024 * 1024
+
+# Every entry gets this timestamp (1980-01-01, the earliest zip can store)
+# so identical content always produces a byte-identical archive
+FIXED_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+FIXED_MTIME = 315532800
+FILE_MODE = 0o644
+
+# Already compressed: deflating these again costs time and saves nothing
+STORED_EXTENSIONS = {
+    '.png', '.jpg', '.jpeg', '.gif', '.webp', '.avif', '.ico',
+    '.woff', '.woff2', '.mp4', '.webm', '.mp3',
+    '.gz', '.br', '.zip', '.npz', '.pbf',
+}
+
+class ChunkedWriter(io.RawIOBase):
+    """Write-only stream that passes data to sink(bytes) in chunk_size pieces
+
+    Not seekable, so zipfile falls back to data descriptors and tarfile
+    streams. Also counts and hashes everything written.
+    """
+
+    def __init__(self, sink, chunk_size=CHUNK_SIZE):
+        self.sink = sink
+        self.chunk_size = chunk_size
+        self.buffer = bytearray()
+        self.size = 0
+        self.digest = hashlib.sha256()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = memoryview(data).cast("B")
+        self.buffer += data
+        self.size += len(data)
+        self.digest.update(data)
+        while len(self.buffer) >= self.chunk_size:
+            self.sink(bytes(self.buffer[:self.chunk_size]))
+            del self.buffer[:self.chunk_size]
+        return len(data)
+
+    def flush(self):
+        # Partial chunks are held back until close so every chunk but the
+        # last is exactly chunk_size
+        pass
+
+    def close(self):
+        if not self.closed and self.buffer:
+            self.sink(bytes(self.buffer))
+            self.buffer.clear()
+        super().close()
+
+def is_precompressed_sibling(path):
+    """.gz/.br written next to a source file by `simple-deploy.py precompress`"""
+    return path.suffix in ('.gz', '.br') and path.with_suffix('').is_file()
+
+def collect_entries(root, include_precompressed=False):
+    """(archive name, path) for every file under root, sorted by name"""
+    root = Path(root)
+    entries = [
+        (path.relative_to(root).as_posix(), path)
+        for path in root.rglob("*")
+        if path.is_file() and (include_precompressed or not is_precompressed_sibling(path))
+    ]
+    return sorted(entries)
+
+def _copy(src_path, dest, chunk_size):
+    with open(src_path, "rb") as src:
+        for block in iter(lambda: src.read(chunk_size), b""):
+            dest.write(block)
+
+def _write_zip(stream, entries, chunk_size):
+    with zipfile.ZipFile(stream, "w") as archive:
+        for name, path in entries:
+            info = zipfile.ZipInfo(name, date_time=FIXED_DATE_TIME)
+            info.external_attr = FILE_MODE << 16
+            info.compress_type = (
+                zipfile.ZIP_STORED if path.suffix.lower() in STORED_EXTENSIONS
+                else zipfile.ZIP_DEFLATED
+            )
+            # Known up front so zipfile picks zip64 for large members
+            info.file_size = path.stat().st_size
+            with archive.open(info, "w") as member:
+                _copy(path, member, chunk_size)
+
+def _write_tar_gz(stream, entries, chunk_size):
+    # mtime=0 and no filename keep the gzip header reproducible
+    with gzip.GzipFile(filename="", mode="wb", fileobj=stream, mtime=0) as compressed:
+        with tarfile.open(fileobj=compressed, mode="w|", format=tarfile.PAX_FORMAT) as archive:
+            for name, path in entries:
+                info = tarfile.TarInfo(name)
+                info.size = path.stat().st_size
+                info.mtime = FIXED_MTIME
+                info.mode = FILE_MODE
+                info.uid = info.gid = 0
+                info.uname = info.gname = ""
+                with open(path, "rb") as src:
+                    archive.addfile(info, src)
+
+def build_archive(root, dest=None, fmt="zip", sink=None, chunk_size=CHUNK_SIZE,
+                  include_precompressed=False):
+    """Archive every file under root into dest, or stream it to sink(chunk)
+
+    Exactly one of dest and sink must be given. Returns a summary with the
+    file count, input bytes, archive bytes and the archive's SHA-256.
+    """
+    if fmt not in ARCHIVE_FORMATS:
+        raise ValueError(f"Unknown archive format {fmt!r} (expected one of {', '.join(ARCHIVE_FORMATS)})")
+    if (dest is None) == (sink is None):
+        raise ValueError("Pass exactly one of dest and sink")
+
+    entries = collect_entries(root, include_precompressed)
+    write = _write_zip if fmt == "zip" else _write_tar_gz
+
+    if dest is not None:
+        dest = Path(dest)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_files.atomic_output(dest, "wb") as f:
+            stream = ChunkedWriter(f.write, chunk_size)
+            write(stream, entries, chunk_size)
+            stream.close()
+    else:
+        stream = ChunkedWriter(sink, chunk_size)
+        write(stream, entries, chunk_size)
+        stream.close()
+
+    return {
+        "format": fmt,
+        "files": len(entries),
+        "bytes_in": sum(path.stat().st_size for _, path in entries),
+        "bytes_out": stream.size,
+        "sha256": stream.digest.hexdigest(),
+        "path": str(dest) if dest is not None else None,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a reproducible deploy archive")
+    parser.add_argument("--root", default="public")
+    parser.add_argument("--format", choices=ARCHIVE_FORMATS, default="zip")
+    parser.add_argument("--out", help="archive path (default: .build-cache/<root>.<format>)")
+    parser.add_argument("--include-precompressed", action="store_true",
+                        help="also archive .gz/.br siblings of source files")
+    args = parser.parse_args()
+
+    out = args.out or Path(".build-cache") / f"{Path(args.root).name}.{args.format}"
+    print(f"📦 Archiving {args.root}/ → {out}...")
+    summary = build_archive(args.root, out, args.format,
+                            include_precompressed=args.include_precompressed)
+    print(f"✅ {summary['files']} files, {summary['bytes_in']:,} → {summary['bytes_out']:,} bytes")
+    print(f"   sha256 {summary['sha256']}")
+
+if __name__ == "__main__":
+    main()
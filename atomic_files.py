@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Atomic file output for build stages and reports
+Writes go to a temp file next to the destination and are renamed into place
+once complete; a failed write removes the temp file. Whole output directories
+are built aside and swapped in with replace_dir
+"""
+
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+# Permissions for newly written outputs (mkstemp would leave them 0600)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+OUTPUT_MODE = 0o666 & ~_UMASK
+
+@contextmanager
+def atomic_output(dest, mode="w", **kwargs):
+    """Write to a temp file next to dest and rename it into place on success
+
+    Readers only ever see the old file or the complete new one, and an
+    interrupted build leaves no partial output behind.
+    """
+    dest = Path(dest)
+    fd, tmp_path = tempfile.mkstemp(dir=dest.parent, prefix=f".{dest.name}.", suffix=".tmp")
+    try:
+        with open(fd, mode, **kwargs) as f:
+            yield f
+        os.chmod(tmp_path, OUTPUT_MODE)
+        os.replace(tmp_path, dest)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+def write_text(path, text, encoding="utf-8"):
+    """Atomically replace path with text; returns the path"""
+    with atomic_output(path, encoding=encoding) as f:
+        f.write(text)
+    return Path(path)
+
+def write_bytes(path, data):
+    """Atomically replace path with data; returns the path"""
+    with atomic_output(path, "wb") as f:
+        f.write(data)
+    return Path(path)
+
+def replace_dir(tmp_dir, dest):
+    """Move a finished tmp_dir into place as dest, then delete the old dest
+
+    Directories can't be swapped atomically, so the old one is renamed
+    aside first: dest is missing only between two renames, never while a
+    tree is being deleted, and a crash there leaves the previous version at
+    .<name>.old instead of half removed. Returns dest.
+    """
+    tmp_dir, dest = Path(tmp_dir), Path(dest)
+    old_dir = dest.with_name(f".{dest.name}.old")
+    shutil.rmtree(old_dir, ignore_errors=True)
+    had_old = dest.exists()
+    if had_old:
+        os.replace(dest, old_dir)
+    try:
+        os.replace(tmp_dir, dest)
+    except BaseException:
+        if had_old:
+            os.replace(old_dir, dest)
+        raise
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return dest
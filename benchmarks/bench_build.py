@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Build and packaging throughput benchmark
+Generates synthetic public/ trees (10 to 10k files, KB to MB sizes) and times
+the main-domain rewrite, the /climate/ subdirectory build (cold, no-op and
+parallel) and artifact packaging, so regressions show up as numbers
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+import atomic_files
+from artifact_builder import build_archive
+from deploy_metrics import METRICS_FORMAT
+
+DEFAULT_FILE_COUNTS = (10, 100, 1000, 10000)
+
+# (share of files, size in bytes): mostly small pages, a few MB-scale data files
+SIZE_CLASSES = ((0.80, 2 * 1024), (0.19, 16 * 1024), (0.01, 1024 * 1024))
+
+# (share of files, suffix); .png files are random bytes and never rewritten
+FILE_KINDS = ((0.6, ".html"), (0.2, ".json"), (0.2, ".png"))
+
+FILES_PER_DIR = 200
+
+HTML_SNIPPET = (
+    '<a href="/climate-scenarios.html">Scenarios</a>\n'
+    '<script src="./js/app.js"></script>\n'
+    '<p>Fetched from http://localhost:8080/api/risk and localhost:3000</p>\n'
+    '<div class="panel">Storm surge and wind exposure summary</div>\n'
+)
+JSON_SNIPPET = '{"lat": 25.7617, "lon": -80.1918, "wind": 120.5, "url": "http://localhost:8000/x"},\n'
+
+def load_build_module():
+    """Import deploy-to-main-domain.py (hyphenated, so not importable by name)
+
+    Registered in sys.modules so --jobs worker processes can pickle its
+    functions by module name.
+    """
+    spec = importlib.util.spec_from_file_location("deploy_to_main_domain",
+                                                  REPO_ROOT / "deploy-to-main-domain.py")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+def pick(rng, choices):
+    roll = rng.random()
+    for share, value in choices:
+        roll -= share
+        if roll < 0:
+            return value
+    return choices[-1][1]
+
+def make_tree(root, n_files, seed=0):
+    """Write a synthetic public/ tree; returns (files, bytes)"""
+    rng = random.Random(seed)
+    total = 0
+    for i in range(n_files):
+        suffix = pick(rng, FILE_KINDS)
+        size = pick(rng, SIZE_CLASSES)
+        # Top-level pages exercise prepare_for_main_domain; the rest nest
+        folder = root if i < FILES_PER_DIR else root / f"d{i // FILES_PER_DIR:03d}"
+        folder.mkdir(parents=True, exist_ok=True)
+        path = folder / f"f{i:05d}{suffix}"
+        if suffix == ".png":
+            path.write_bytes(rng.randbytes(size))
+        else:
+            snippet = HTML_SNIPPET if suffix == ".html" else JSON_SNIPPET
+            path.write_text((snippet * (size // len(snippet) + 1))[:size])
+        total += size
+    return n_files, total
+
+def timed(label, n_bytes, func):
+    """Run func quietly; returns a result row with throughput
+
+    Raises RuntimeError if the run's metrics count failed files, so a broken
+    build is never reported as a throughput number.
+    """
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        start = time.perf_counter()
+        report = func()
+        seconds = time.perf_counter() - start
+    failed = report.get("counters", {}).get("files_failed", 0) if isinstance(report, dict) else 0
+    if failed:
+        raise RuntimeError(f"{label}: {failed} files failed\n{output.getvalue()}")
+    row = {
+        "run": label,
+        "seconds": round(seconds, 6),
+        "mb_per_second": round(n_bytes / seconds / 1e6, 3) if seconds else None,
+    }
+    if isinstance(report, dict):
+        row["metrics"] = report
+    return row
+
+def bench_tree(build, n_files, jobs, seed):
+    """Time every stage against one synthetic tree in a scratch directory"""
+    workdir = Path(tempfile.mkdtemp(prefix=f"bench-build-{n_files}-"))
+    previous = os.getcwd()
+    try:
+        os.chdir(workdir)
+        files, size = make_tree(Path("public"), n_files, seed)
+        rows = [
+            timed("subdirectory cold", size, lambda: build.create_subdirectory_structure(force=True)),
+            timed("subdirectory no-op", size, lambda: build.create_subdirectory_structure()),
+            timed(f"subdirectory cold --jobs {jobs}", size,
+                  lambda: build.create_subdirectory_structure(force=True, jobs=jobs)),
+            timed("main-domain cold", size, lambda: build.prepare_for_main_domain(force=True)),
+            timed("archive zip", size, lambda: build_archive("public", "artifact.zip")),
+            timed("archive tar.gz", size, lambda: build_archive("public", "artifact.tar.gz", "tar.gz")),
+        ]
+        for row in rows:
+            row["files_per_second"] = round(files / row["seconds"], 1) if row["seconds"] else None
+        return {"files": files, "bytes": size, "runs": rows}
+    finally:
+        os.chdir(previous)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark build and packaging throughput")
+    parser.add_argument("--files", type=int, nargs="+", default=list(DEFAULT_FILE_COUNTS),
+                        help="tree sizes to generate (default: 10 100 1000 10000)")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(),
+                        help="worker processes for the parallel build run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=str(REPO_ROOT / ".build-cache" / "metrics" / "bench_build.json"))
+    args = parser.parse_args()
+
+    build = load_build_module()
+    results = []
+    for n_files in args.files:
+        print(f"🏁 {n_files:,} files...")
+        result = bench_tree(build, n_files, args.jobs, args.seed)
+        results.append(result)
+        for row in result["runs"]:
+            print(f"   {row['run']:<28} {row['seconds']:8.3f}s "
+                  f"{row['files_per_second'] or 0:>10,.0f} files/s {row['mb_per_second'] or 0:>8,.1f} MB/s")
+
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    atomic_files.write_text(out, json.dumps({
+        "format": METRICS_FORMAT,
+        "python": sys.version.split()[0],
+        "cpu_count": os.cpu_count(),
+        "jobs": args.jobs,
+        "seed": args.seed,
+        "trees": results,
+    }, indent=1))
+    print(f"✅ Results written to {out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Hazard re-scoring latency benchmark
+Times the what-if operations behind the real-estate-risk.html controls (one
+weight, all weights, horizon, confidence read-out) on synthetic portfolios
+of 1k to 1M locations against the 50 ms interactive budget
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+import atomic_files
+import hazard_scoring
+from deploy_metrics import METRICS_FORMAT
+
+DEFAULT_LOCATIONS = (1000, 100000, 1000000)
+BUDGET_MS = 50.0
+
+def bench_portfolio(hazards, n_locations, repeats, seed):
+    rng = np.random.default_rng(seed)
+    matrix = rng.uniform(0, 100, size=(n_locations, len(hazards))).astype(np.float32)
+
+    start = time.perf_counter()
+    scorer = hazard_scoring.HazardScorer(matrix, hazards)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    operations = {
+        "set_weight": lambda: scorer.set_weight(int(rng.integers(len(hazards))), rng.uniform(0.05, 1.0)),
+        "set_weights": lambda: scorer.set_weights(rng.uniform(0.05, 1.0, len(hazards))),
+        "set_horizon": lambda: scorer.set_horizon(rng.choice(scorer.horizons)),
+        "scores": lambda: scorer.scores(rng.choice(scorer.confidence_levels)),
+    }
+    rows = []
+    for name, operation in operations.items():
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            operation()
+            times.append((time.perf_counter() - start) * 1000)
+        rows.append({
+            "operation": name,
+            "median_ms": round(float(np.median(times)), 3),
+            "p95_ms": round(float(np.percentile(times, 95)), 3),
+        })
+    return {"locations": n_locations, "build_ms": round(build_ms, 3), "operations": rows}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark hazard re-scoring latency")
+    parser.add_argument("--locations", type=int, nargs="+", default=list(DEFAULT_LOCATIONS),
+                        help="portfolio sizes to generate (default: 1000 100000 1000000)")
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=str(REPO_ROOT / ".build-cache" / "metrics" / "bench_hazard_scoring.json"))
+    args = parser.parse_args()
+
+    hazards = hazard_scoring.load_inline_hazards(REPO_ROOT / "public" / "real-estate-risk.html")
+    results = []
+    for n_locations in args.locations:
+        print(f"🏁 {n_locations:,} locations...")
+        result = bench_portfolio(hazards, n_locations, args.repeats, args.seed)
+        results.append(result)
+        for row in result["operations"]:
+            flag = "✅" if row["p95_ms"] < BUDGET_MS else "⚠️ "
+            print(f"   {flag} {row['operation']:<12} {row['median_ms']:8.2f} ms median {row['p95_ms']:8.2f} ms p95")
+
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    atomic_files.write_text(out, json.dumps({
+        "format": METRICS_FORMAT,
+        "python": sys.version.split()[0],
+        "cpu_count": os.cpu_count(),
+        "budget_ms": BUDGET_MS,
+        "portfolios": results,
+    }, indent=1))
+    print(f"✅ Results written to {out}")
+
+if __name__ == "__main__":
+    main()
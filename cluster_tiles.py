@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Property cluster tile build stage
+Aggregates a portfolio into a z/x/y pyramid of clusters (count, total value,
+worst risk tier) so the maps in climate-scenarios.html only load the tiles in
+view, however many properties there are
+"""
+
+import argparse
+import json
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+import atomic_files
+import exposure_engine
+import scenario_data
+import storm_synthesis
+
+CLUSTER_DIR = Path("public/data/clusters")
+TILE_FORMAT = 1
+
+MIN_ZOOM = 0
+MAX_ZOOM = 10
+
+# Clusters per tile side: 8 gives 64 px cells on 512 px map tiles. At
+# MAX_ZOOM a cell is ~5 km, close enough to individual properties.
+CLUSTER_CELLS = 8
+
+# Web Mercator latitude limit
+MAX_LATITUDE = 85.0511287798
+
+def mercator(lat, lon):
+    """Normalized Web Mercator coordinates in [0, 1), y growing southwards"""
+    lat = np.radians(np.clip(lat, -MAX_LATITUDE, MAX_LATITUDE))
+    x = (np.asarray(lon, dtype=float) + 180.0) / 360.0
+    y = (1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / np.pi) / 2.0
+    return np.clip(x, 0.0, np.nextafter(1.0, 0.0)), np.clip(y, 0.0, np.nextafter(1.0, 0.0))
+
+def cluster_level(x, y, zoom, cells=CLUSTER_CELLS):
+    """Group points into the cluster grid of one zoom level
+
+    Returns (cell column, cell row, inverse) where inverse maps every point
+    to its cluster.
+    """
+    n = (1 << zoom) * cells
+    gx = (x * n).astype(np.int64)
+    gy = (y * n).astype(np.int64)
+    keys, inverse = np.unique(gy * n + gx, return_inverse=True)
+    return keys % n, keys // n, inverse
+
+def build_pyramid(portfolio, tiers, min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM, cells=CLUSTER_CELLS):
+    """{(z, x, y): [GeoJSON features]} for every non-empty tile
+
+    Each feature is one cluster at the members' mean position, with their
+    count, total value and worst (highest) tier code. Single-property
+    clusters also carry the property id.
+    """
+    lat = np.asarray(portfolio["lat"], dtype=float)
+    lon = np.asarray(portfolio["lon"], dtype=float)
+    value = np.asarray(portfolio["value"], dtype=float)
+    tiers = np.asarray(tiers, dtype=np.int64)
+    ids = portfolio["id"]
+    x, y = mercator(lat, lon)
+
+    tiles = {}
+    for zoom in range(min_zoom, max_zoom + 1):
+        gx, gy, inverse = cluster_level(x, y, zoom, cells)
+        n_clusters = len(gx)
+        count = np.bincount(inverse, minlength=n_clusters)
+        mean_lat = np.bincount(inverse, lat, n_clusters) / count
+        mean_lon = np.bincount(inverse, lon, n_clusters) / count
+        total_value = np.bincount(inverse, value, n_clusters)
+        worst = np.zeros(n_clusters, dtype=np.int64)
+        np.maximum.at(worst, inverse, tiers)
+        # Any member index will do for single-property clusters
+        member = np.empty(n_clusters, dtype=np.int64)
+        member[inverse] = np.arange(len(inverse))
+
+        for c in range(n_clusters):
+            properties = {
+                "count": int(count[c]),
+                "tier": int(worst[c]),
+                "value": round(float(total_value[c]), 2),
+            }
+            if count[c] == 1:
+                properties["id"] = str(ids[member[c]])
+            feature = {
+                "type": "Feature",
+                "geometry": {
+                    "type": "Point",
+                    "coordinates": [round(float(mean_lon[c]), 5), round(float(mean_lat[c]), 5)],
+                },
+                "properties": properties,
+            }
+            tile = (zoom, int(gx[c] // cells), int(gy[c] // cells))
+            tiles.setdefault(tile, []).append(feature)
+    return tiles
+
+def write_pyramid(tiles, n_properties, min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM, out_dir=CLUSTER_DIR):
+    """Write z/x/y.json tiles plus index.json, replacing the previous pyramid"""
+    out_dir = Path(out_dir)
+    tmp_dir = out_dir.with_name(f".{out_dir.name}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    available = {}
+    for (zoom, x, y), features in sorted(tiles.items()):
+        path = tmp_dir / str(zoom) / str(x) / f"{y}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_files.write_text(path, json.dumps({"type": "FeatureCollection", "features": features},
+                                                 separators=(",", ":")))
+        available.setdefault(str(zoom), []).append(f"{x}/{y}")
+
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    atomic_files.write_text(tmp_dir / "index.json", json.dumps({
+        "format": TILE_FORMAT,
+        "min_zoom": min_zoom,
+        "max_zoom": max_zoom,
+        "tiers": list(exposure_engine.TIERS),
+        "properties": n_properties,
+        # Non-empty tiles per zoom, so the page never requests missing ones
+        "tiles": available,
+    }, separators=(",", ":")))
+
+    return atomic_files.replace_dir(tmp_dir, out_dir)
+
+def assess_tiers(portfolio, scenario, decade, n_storms, seed=0):
+    """Risk tier code per property for one scenario/decade"""
+    stats = scenario_data.load_scenarios()[scenario][decade]
+    if n_storms:
+        rng = storm_synthesis.ensemble_rng(seed, scenario, decade)
+        ensemble = storm_synthesis.synthesize_storms(stats["avg_wind"], n_storms, rng)
+    else:
+        ensemble = storm_synthesis.from_sample_storms(stats["sample_storms"])
+    result = exposure_engine.assess_exposure(portfolio, ensemble, stats["storms_per_year"], index=True)
+    return result["tier"]
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the property cluster tile pyramid")
+    parser.add_argument("--portfolio", help="CSV/JSON portfolio or store directory (default: climate-scenarios.html properties)")
+    parser.add_argument("--scenario", default="baseline", help="scenario used to assign risk tiers")
+    parser.add_argument("--decade", default="2020s")
+    parser.add_argument("--storms", type=int, default=1000,
+                        help="synthetic storms for tiering (0 = the page's sample storms)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-zoom", type=int, default=MIN_ZOOM)
+    parser.add_argument("--max-zoom", type=int, default=MAX_ZOOM)
+    parser.add_argument("--out", default=str(CLUSTER_DIR))
+    args = parser.parse_args()
+
+    portfolio = exposure_engine.load_portfolio(args.portfolio)
+    n_properties = len(portfolio["lat"])
+    print(f"🗺️  Clustering {n_properties:,} properties (zoom {args.min_zoom}-{args.max_zoom}, "
+          f"tiers from {args.scenario} {args.decade})...")
+
+    tiers = assess_tiers(portfolio, args.scenario, args.decade, args.storms, args.seed)
+    tiles = build_pyramid(portfolio, tiers, args.min_zoom, args.max_zoom)
+    out_dir = write_pyramid(tiles, n_properties, args.min_zoom, args.max_zoom, args.out)
+    print(f"✅ {len(tiles):,} tiles written to {out_dir}")
+
+if __name__ == "__main__":
+    main()
@@ -4,61 +4,432 @@ Deploy climate risk analysis to main domain johnnycchung.com
 This script fixes paths and prepares files for deployment to the root domain
 """
 
+import argparse
+import hashlib
+import json
+import mimetypes
 import os
 import re
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
-def fix_localhost_links(content, file_path):
-    """Fix localhost and relative path issues"""
+import atomic_files
+from deploy_metrics import DeployMetrics
+
+MAIN_DOMAIN = "johnnycchung.com"
+
+# Build manifests live outside public/ so they are never deployed
+BUILD_CACHE_DIR = Path(".build-cache")
+MANIFEST_FORMAT = 1
+
+# Only these are decoded and rewritten; everything else (tiles, PNG legends,
+# compressed data) is copied byte for byte
+TEXT_EXTENSIONS = {
+    '.html', '.htm', '.css', '.js', '.mjs', '.json', '.geojson', '.md',
+    '.txt', '.xml', '.svg', '.csv', '.webmanifest',
+}
+TEXT_MIME_TYPES = {'application/javascript', 'application/json', 'application/xml'}
+
+# Files above this size are rewritten chunk by chunk instead of loaded whole
+STREAM_THRESHOLD = 1024 * 1024
+STREAM_CHUNK_SIZE = 256 * 1024
+
+class LinkRewriter:
+    """Rewrite localhost and path references in a single regex pass
+    
+    Every rule is compiled into one alternation, so the cost of a rewrite
+    scales with the size of the file rather than rules x bytes. The text is
+    scanned once and replaced text is never matched again.
+    
+    The old fix_localhost_links ran one pass per rule, so one rewrite could
+    create a match for a later pass. The href/src rules absorb the chains
+    that occur in real links (src=".//x", href="http://localhost:8080//x").
+    Output can still differ from the old passes in three cases:
+    - a removed localhost URL splices two fragments into a new match, as
+      in 'hrefhttp://localhost:1/="/';
+    - a localhost port is longer than 5 digits;
+    - more than four localhost prefixes are chained at the start of an
+      href/src value.
+    The last two exist because every match must fit in MAX_MATCH.
+    """
+    
+    # Upper bound on the length of any single match. Chunked rewrites hold
+    # back this many characters so a match never straddles two chunks.
+    MAX_MATCH = 512
+    
+    def __init__(self, domain=MAIN_DOMAIN):
+        self.domain = domain
+        
+        # (pattern, replacement) - patterns must not contain capture groups
+        common_rules = [
+            # Remove localhost references (ports are at most 5 digits)
+            (r'https?://localhost:\d{1,5}/', ''),
+            # Fix common localhost patterns
+            (r'localhost:(?:8080|3000|8000)', domain),
+        ]
+        # The original fix_localhost_links ran each rule as its own pass:
+        # every localhost prefix went first, then one "./", then one "/".
+        # Folding that chain into the attribute rules keeps inputs such as
+        # src=".//x" or href="http://localhost:8080//x" rewriting the same.
+        localhost = r'(?:https?://localhost:\d{1,5}/){0,4}'
+        attribute_tail = localhost + r'(?:\.' + localhost + '/' + localhost + r')?(?:/' + localhost + ')?'
+        html_rules = [
+            # Relative links and absolute paths both become root-relative
+            (r'href="' + attribute_tail, 'href="'),
+            (r'src="' + attribute_tail, 'src="'),
+        ]
+        
+        self.rules = common_rules + html_rules
+        self._replacements = {f"r{i}": repl for i, (_, repl) in enumerate(self.rules)}
+        self._common_pattern = self._compile(common_rules)
+        self._html_pattern = self._compile(self.rules)
+    
+    @property
+    def version(self):
+        """Fingerprint of the rule set, used to invalidate build manifests"""
+        return hashlib.sha256(repr((self.domain, self.rules)).encode()).hexdigest()[:16]
+    
+    @staticmethod
+    def _compile(rules):
+        # Group names index into self.rules, so rules must be a prefix of it
+        alternation = "|".join(
+            f"(?P<r{i}>{pattern})" for i, (pattern, _) in enumerate(rules)
+        )
+        return re.compile(alternation)
+    
+    def _replace(self, match):
+        return self._replacements[match.lastgroup]
+    
+    def _pattern(self, html):
+        return self._html_pattern if html else self._common_pattern
+    
+    def rewrite(self, content, html=False):
+        """Rewrite a whole string, returning (content, replacement_count)"""
+        return self._pattern(html).subn(self._replace, content)
+    
+    def rewrite_stream(self, reader, writer, html=False, chunk_size=STREAM_CHUNK_SIZE):
+        """Rewrite text from reader to writer without holding the whole file
+        
+        Returns the number of replacements made.
+        """
+        pattern = self._pattern(html)
+        pending = ""
+        count = 0
+        
+        while True:
+            chunk = reader.read(chunk_size)
+            buffer = pending + chunk
+            # On the final read everything can be committed
+            cut = len(buffer) - self.MAX_MATCH if chunk else len(buffer)
+            
+            pos = 0
+            out = []
+            for match in pattern.finditer(buffer):
+                if match.start() >= cut:
+                    break
+                out.append(buffer[pos:match.start()])
+                out.append(self._replace(match))
+                pos = match.end()
+                count += 1
+            
+            commit = max(pos, cut)
+            out.append(buffer[pos:commit])
+            writer.write("".join(out))
+            pending = buffer[commit:]
+            
+            if not chunk:
+                return count
+    
+    def has_match(self, src, html=False, chunk_size=STREAM_CHUNK_SIZE):
+        """True if any rule matches in src, read chunk by chunk"""
+        pattern = self._pattern(html)
+        tail = ""
+        with open(src, "r", encoding="utf-8", newline="") as reader:
+            for chunk in iter(lambda: reader.read(chunk_size), ""):
+                buffer = tail + chunk
+                if pattern.search(buffer):
+                    return True
+                tail = buffer[-self.MAX_MATCH:]
+        return False
+    
+    def rewrite_file(self, src, dest=None):
+        """Rewrite src into dest (in place when dest is None)
+        
+        Small files are rewritten in memory, large ones are streamed.
+        Returns the number of replacements made. When there is nothing to
+        replace, dest is not written at all; callers building into another
+        directory link or copy src instead.
+        """
+        src = Path(src)
+        dest = Path(dest) if dest is not None else src
+        html = src.suffix == '.html'
+        
+        if src.stat().st_size <= STREAM_THRESHOLD:
+            content, count = self.rewrite(src.read_text(encoding='utf-8'), html)
+            if count:
+                with atomic_files.atomic_output(dest, encoding='utf-8') as writer:
+                    writer.write(content)
+            return count
+        
+        # A scan is cheaper than streaming a full copy that turns out unchanged
+        if not self.has_match(src, html):
+            return 0
+        with open(src, "r", encoding="utf-8", newline="") as reader, \
+                atomic_files.atomic_output(dest, encoding="utf-8", newline="") as writer:
+            return self.rewrite_stream(reader, writer, html)
+
+REWRITER = LinkRewriter()
+
+def file_digest(path):
+    """SHA-256 of a file's bytes, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(STREAM_CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _stat_key(path):
+    stat = path.stat()
+    return [stat.st_size, stat.st_mtime_ns]
+
+def manifest_entry(src, dest, identity):
+    """Describe a finished src -> dest build for the manifest"""
+    dest_hash = file_digest(dest)
+    src_hash = dest_hash if src == dest or identity else file_digest(src)
+    return {
+        "src_stat": _stat_key(src),
+        "src_hash": src_hash,
+        "dest_stat": _stat_key(dest),
+        "dest_hash": dest_hash,
+        "identity": identity,
+    }
+
+class BuildManifest:
+    """Record of previous build outputs keyed by content hash and rule version
     
-    # Remove localhost references
-    content = re.sub(r'http://localhost:\d+/', '', content)
-    content = re.sub(r'https://localhost:\d+/', '', content)
+    A file is skipped when its source and output are unchanged since the last
+    build. The (size, mtime) pair is checked first so a no-op rebuild never
+    reads file contents; hashes settle the cases where only mtime moved.
+    """
     
-    # Fix common localhost patterns
-    content = content.replace('localhost:8080', 'johnnycchung.com')
-    content = content.replace('localhost:3000', 'johnnycchung.com')
-    content = content.replace('localhost:8000', 'johnnycchung.com')
+    def __init__(self, path, rules_version):
+        self.path = Path(path)
+        self.rules_version = rules_version
+        self.entries = {}
+        self.previous = set()
+        self._seen = set()
+        
+        if self.path.exists():
+            try:
+                data = json.loads(self.path.read_text())
+            except (OSError, ValueError):
+                data = {}
+            if data.get("format") == MANIFEST_FORMAT:
+                # Kept across rule changes and --force so removed sources
+                # can still be pruned
+                self.previous = set(data.get("files", {}))
+            if data.get("format") == MANIFEST_FORMAT and data.get("rules") == rules_version:
+                self.entries = data.get("files", {})
+    
+    def _matches(self, path, stat_key, digest):
+        if not path.exists():
+            return False
+        if _stat_key(path) == stat_key:
+            return True
+        return file_digest(path) == digest
     
-    # Ensure relative paths for same-domain resources
-    if file_path.suffix == '.html':
-        # Fix relative links to work from root domain
-        content = re.sub(r'href="\./', 'href="', content)
-        content = re.sub(r'src="\./', 'src="', content)
+    def is_fresh(self, src, dest):
+        """True when dest is the current build output for src"""
+        key = str(src)
+        self._seen.add(key)
+        entry = self.entries.get(key)
+        if entry is None:
+            return False
+        
+        if not (self._matches(src, entry["src_stat"], entry["src_hash"])
+                and self._matches(dest, entry["dest_stat"], entry["dest_hash"])):
+            return False
         
-        # Fix absolute paths to be relative
-        content = re.sub(r'href="/', 'href="', content)
-        content = re.sub(r'src="/', 'src="', content)
+        # Content matched on hash alone; remember the new stat for next time
+        entry["src_stat"] = _stat_key(src)
+        entry["dest_stat"] = _stat_key(dest)
+        return True
+    
+    def is_identity(self, src):
+        """True when src is unchanged and its last rewrite was a no-op"""
+        entry = self.entries.get(str(src))
+        return (entry is not None and entry["identity"]
+                and self._matches(src, entry["src_stat"], entry["src_hash"]))
+    
+    def record(self, src, entry):
+        """Record a manifest_entry as the build output for src"""
+        key = str(src)
+        self._seen.add(key)
+        self.entries[key] = entry
+    
+    def removed(self):
+        """Sources in the previous manifest that were not part of this build"""
+        return sorted(self.previous - self._seen)
+    
+    def save(self):
+        """Write the manifest, dropping files that were not part of this build"""
+        self.entries = {k: v for k, v in self.entries.items() if k in self._seen}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_files.write_text(self.path, json.dumps({
+            "format": MANIFEST_FORMAT,
+            "rules": self.rules_version,
+            "files": self.entries,
+        }, indent=1, sort_keys=True))
+
+def link_or_copy(src, dest):
+    """Place an exact copy of src at dest without decoding it"""
+    tmp_path = dest.with_name(f".{dest.name}.{os.getpid()}.link")
+    try:
+        try:
+            os.link(src, tmp_path)
+        except OSError:
+            shutil.copy2(src, tmp_path)
+        os.replace(tmp_path, dest)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+def is_text_asset(path):
+    """True for files the link rewriter should decode and rewrite"""
+    path = Path(path)
+    if path.suffix.lower() in TEXT_EXTENSIONS or path.name == '.htaccess':
+        return True
+    mime, encoding = mimetypes.guess_type(path.name)
+    # .gz/.br siblings are binary whatever they wrap
+    if mime is None or encoding is not None:
+        return False
+    return mime.startswith('text/') or mime in TEXT_MIME_TYPES
+
+def build_file(src, dest, known_identity=False):
+    """Build one output file; returns (manifest entry, metric counters)
+    
+    Runs in worker processes for parallel builds, so it only touches its
+    own src/dest pair and reports back through the return value.
+    """
+    size = src.stat().st_size
+    if known_identity or not is_text_asset(src):
+        # Binary assets and files known to need no rewriting are linked or
+        # copied (sendfile on Linux) without ever being decoded
+        link_or_copy(src, dest)
+        identity = True
+        stats = {"files_linked": 1, "bytes_linked": size}
+    else:
+        start = time.perf_counter()
+        # rewrite_file leaves dest alone when there is nothing to rewrite
+        links = REWRITER.rewrite_file(src, dest)
+        identity = links == 0
+        if identity and dest != src:
+            link_or_copy(src, dest)
+        stats = {
+            "files_rewritten": 1,
+            "links_rewritten": links,
+            "bytes_read": size,
+            "bytes_written": 0 if identity else dest.stat().st_size,
+            "rewrite_seconds": time.perf_counter() - start,
+        }
+    return manifest_entry(src, dest, identity), stats
+
+def run_build(tasks, jobs=1):
+    """Run build_file over (src, dest, known_identity) tasks
+    
+    Yields (task, (entry, stats), error) as files finish. With jobs > 1 the files are
+    rewritten in a process pool; errors are reported per file either way.
+    """
+    if jobs <= 1:
+        for task in tasks:
+            try:
+                yield task, build_file(*task), None
+            except Exception as e:
+                yield task, None, e
+        return
+    
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(build_file, *task): task for task in tasks}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], None, e
+
+def prune_outputs(sources, src_root, dest_root):
+    """Delete the outputs of removed sources and any directories left empty
     
-    return content
+    Returns the number of files deleted.
+    """
+    src_root, dest_root = Path(src_root), Path(dest_root)
+    pruned = 0
+    for src in sources:
+        try:
+            dest = dest_root / Path(src).relative_to(src_root)
+        except ValueError:
+            continue
+        if Path(src).exists() or not dest.is_file():
+            continue
+        dest.unlink()
+        pruned += 1
+        for parent in dest.parents:
+            if parent == dest_root or dest_root not in parent.parents:
+                break
+            try:
+                parent.rmdir()
+            except OSError:
+                break
+    return pruned
 
-def prepare_for_main_domain():
+def fix_localhost_links(content, file_path):
+    """Fix localhost and relative path issues"""
+    return REWRITER.rewrite(content, html=file_path.suffix == '.html')[0]
+
+def prepare_for_main_domain(force=False, jobs=1):
     """Prepare all files for deployment to johnnycchung.com"""
     
     public_dir = Path("public")
+    metrics = DeployMetrics("main-domain")
+    manifest = BuildManifest(BUILD_CACHE_DIR / "main-domain.json", REWRITER.version)
+    if force:
+        manifest.entries = {}
     
     print("🚀 Preparing files for johnnycchung.com deployment...")
     
     # Process all HTML files
-    html_files = list(public_dir.glob("*.html"))
-    
-    for html_file in html_files:
-        print(f"📝 Processing {html_file.name}...")
+    with metrics.stage("scan"):
+        html_files = list(public_dir.glob("*.html"))
+        tasks = []
+        skipped = 0
         
-        try:
-            # Read file
-            content = html_file.read_text(encoding='utf-8')
-            
-            # Fix links
-            content = fix_localhost_links(content, html_file)
+        for html_file in html_files:
+            if manifest.is_fresh(html_file, html_file):
+                skipped += 1
+                continue
             
-            # Write back
-            html_file.write_text(content, encoding='utf-8')
+            print(f"📝 Processing {html_file.name}...")
+            tasks.append((html_file, html_file, False))
+    metrics.update({"files_scanned": len(html_files), "files_skipped": skipped})
+    
+    # Fix links in a single pass and write back atomically
+    with metrics.stage("build"):
+        for (html_file, _, _), result, error in run_build(tasks, jobs):
+            if error is not None:
+                print(f"❌ Error processing {html_file.name}: {error}")
+                metrics.add("files_failed")
+                continue
             
+            entry, stats = result
+            manifest.record(html_file, entry)
+            metrics.update(stats)
             print(f"✅ Fixed {html_file.name}")
-            
-        except Exception as e:
-            print(f"❌ Error processing {html_file.name}: {e}")
+    
+    with metrics.stage("manifest"):
+        manifest.save()
+    if skipped:
+        print(f"⏭️  Skipped {skipped} unchanged file(s)")
     
     # Create .htaccess for proper routing (if needed)
     htaccess_content = """# Climate Risk Analysis - Main Domain Setup
@@ -95,8 +466,9 @@ RewriteRule ^(.*)$ https://%{HTTP_HOST}%{REQUEST_URI} [L,R=301]
     print("1. Upload public/ contents to johnnycchung.com root directory")
     print("2. Or use GitHub Pages with johnnycchung.com as custom domain")
     print("3. Test all 4 climate applications")
+    return metrics.finish()
 
-def create_subdirectory_structure():
+def create_subdirectory_structure(force=False, jobs=1):
     """Create climate subdirectory structure for johnnycchung.com/climate/"""
     
     print("🗂️  Creating /climate/ subdirectory structure...")
@@ -106,29 +478,77 @@ def create_subdirectory_structure():
     climate_dir.mkdir(exist_ok=True)
     
     public_dir = Path("public")
+    metrics = DeployMetrics("subdirectory")
+    manifest = BuildManifest(BUILD_CACHE_DIR / "subdirectory.json", REWRITER.version)
+    if force:
+        manifest.entries = {}
+    tasks = []
+    skipped = 0
+    scanned = 0
     
     # Copy all files to climate subdirectory
-    for file_path in public_dir.rglob("*"):
-        if file_path.is_file():
-            relative_path = file_path.relative_to(public_dir)
-            dest_path = climate_dir / relative_path
-            
-            # Create parent directories
-            dest_path.parent.mkdir(parents=True, exist_ok=True)
-            
-            # Copy and fix file
-            content = file_path.read_text(encoding='utf-8')
-            content = fix_localhost_links(content, file_path)
+    with metrics.stage("scan"):
+        for file_path in public_dir.rglob("*"):
+            if file_path.is_file():
+                scanned += 1
+                relative_path = file_path.relative_to(public_dir)
+                dest_path = climate_dir / relative_path
+                
+                if manifest.is_fresh(file_path, dest_path):
+                    skipped += 1
+                    continue
+                
+                # Create parent directories
+                dest_path.parent.mkdir(parents=True, exist_ok=True)
+                
+                tasks.append((file_path, dest_path, manifest.is_identity(file_path)))
+    metrics.update({"files_scanned": scanned, "files_skipped": skipped})
+    
+    # Copy and fix files; outputs are replaced atomically, never written
+    # through a hard link back into public/
+    with metrics.stage("build"):
+        for (file_path, _, _), result, error in run_build(tasks, jobs):
+            if error is not None:
+                print(f"❌ Error processing {file_path}: {error}")
+                metrics.add("files_failed")
+                continue
             
-            dest_path.write_text(content, encoding='utf-8')
+            entry, stats = result
+            manifest.record(file_path, entry)
+            metrics.update(stats)
     
+    # Outputs whose source was deleted from public/ since the last build
+    with metrics.stage("prune"):
+        pruned = prune_outputs(manifest.removed(), public_dir, climate_dir)
+    metrics.add("files_pruned", pruned)
+    
+    with metrics.stage("manifest"):
+        manifest.save()
+    if skipped:
+        print(f"⏭️  Skipped {skipped} unchanged file(s)")
+    if pruned:
+        print(f"🗑️  Removed {pruned} file(s) no longer in {public_dir}/")
     print("✅ Climate subdirectory created")
     print("📁 Upload climate_subdirectory/ contents to johnnycchung.com/climate/")
+    return metrics.finish()
 
-if __name__ == "__main__":
-    import sys
+def main():
+    parser = argparse.ArgumentParser(description="Prepare public/ for johnnycchung.com")
+    parser.add_argument("target", nargs="?", choices=("main-domain", "subdirectory"), default="main-domain",
+                        help="rewrite public/ in place (default) or build climate_subdirectory/")
+    parser.add_argument("--force", action="store_true",
+                        help="ignore the build manifest and rebuild every file")
+    parser.add_argument("--jobs", type=int, default=1, metavar="N",
+                        help="rewrite files in N worker processes (0 = one per CPU)")
+    args = parser.parse_args()
+    if args.jobs < 0:
+        parser.error("--jobs must be 0 or more")
+    jobs = args.jobs or os.cpu_count()
     
-    if len(sys.argv) > 1 and sys.argv[1] == "subdirectory":
-        create_subdirectory_structure()
+    if args.target == "subdirectory":
+        create_subdirectory_structure(force=args.force, jobs=jobs)
     else:
-        prepare_for_main_domain()
\ No newline at end of file
+        prepare_for_main_domain(force=args.force, jobs=jobs)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Timing and counters for build and deploy runs
+Each run records wall time per stage plus counters (files, bytes, API calls,
+retries) and writes a JSON report next to the build manifests
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+import atomic_files
+
+METRICS_FORMAT = 1
+
+# Reports go to .build-cache/metrics/<run name>.json unless overridden
+METRICS_DIR = Path(os.environ.get("DEPLOY_METRICS_DIR", ".build-cache/metrics"))
+
+class DeployMetrics:
+    """Stage timers and counters for one build or deploy run
+
+    Counters may be updated from worker threads. Stages can repeat; their
+    wall times and call counts accumulate.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.started_at = datetime.now(timezone.utc)
+        self._start = time.perf_counter()
+        self.stages = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block as stage `name`"""
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                stage = self.stages.setdefault(name, {"seconds": 0.0, "calls": 0})
+                stage["seconds"] += elapsed
+                stage["calls"] += 1
+
+    def add(self, counter, amount=1):
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def update(self, counts):
+        """Add every counter in a dict (e.g. stats returned by a worker process)"""
+        with self._lock:
+            for counter, amount in counts.items():
+                self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def count_tree(self, root):
+        """Count the files and bytes under root as files_scanned/bytes_scanned"""
+        files = size = 0
+        for path in Path(root).rglob("*"):
+            if path.is_file():
+                files += 1
+                size += path.stat().st_size
+        self.update({"files_scanned": files, "bytes_scanned": size})
+
+    def report(self):
+        """Machine-readable summary of the run so far"""
+        with self._lock:
+            return {
+                "format": METRICS_FORMAT,
+                "name": self.name,
+                "started_at": self.started_at.isoformat(timespec="seconds"),
+                "total_seconds": round(time.perf_counter() - self._start, 6),
+                "stages": {
+                    name: {"seconds": round(stage["seconds"], 6), "calls": stage["calls"]}
+                    for name, stage in self.stages.items()
+                },
+                "counters": {
+                    name: round(value, 6) if isinstance(value, float) else value
+                    for name, value in self.counters.items()
+                },
+            }
+
+    def write(self, path=None):
+        """Write the report as JSON; returns its path"""
+        path = Path(path) if path is not None else METRICS_DIR / f"{self.name}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return atomic_files.write_text(path, json.dumps(self.report(), indent=1))
+
+    def finish(self, path=None):
+        """Print a one-line stage breakdown and write the report"""
+        report = self.report()
+        stages = ", ".join(f"{name} {stage['seconds']:.2f}s" for name, stage in report["stages"].items())
+        path = self.write(path)
+        print(f"⏱️  {self.name}: {report['total_seconds']:.2f}s ({stages}) → {path}")
+        return report
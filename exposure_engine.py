@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+"""
+Property exposure engine for hurricane storm ensembles
+Distance-based damage, construction multipliers, risk tiers and expected loss
+computed as broadcast (properties x track points) arrays in memory-bounded chunks
+"""
+
+import argparse
+import csv
+import io
+import json
+from pathlib import Path
+
+import numpy as np
+
+import scenario_data
+import storm_synthesis
+from spatial_index import EARTH_RADIUS_NM, GridIndex, haversine_nm
+
+# Vulnerability by construction type (wood frame is the reference-worst case)
+CONSTRUCTION_TYPES = ("wood", "masonry", "steel", "concrete")
+CONSTRUCTION_MULTIPLIERS = {"wood": 1.5, "masonry": 1.0, "steel": 0.8, "concrete": 0.6}
+
+# Damage starts at tropical storm strength and saturates at Cat 5
+DAMAGING_WIND = 39.0
+CAT5_WIND = 157.0
+
+# Damage decays as exp(-distance / radius) and is ignored beyond this many radii
+DAMAGE_CUTOFF = 5.0
+
+# Risk tiers: closest approach in storm radii, most severe first. A property
+# takes the most severe tier whose band is entered at least TIER_ANNUAL_RATE
+# times per year (1-in-100), so a handful of sample storms and a 10k-storm
+# ensemble are classified on the same footing.
+TIERS = ("Safe", "Low", "Moderate", "High", "Extreme")
+TIER_BANDS = ((1.0, "Extreme"), (2.0, "High"), (3.0, "Moderate"), (5.0, "Low"))
+TIER_ANNUAL_RATE = 0.01
+
+# Default working-set size for one chunk of the cross product
+MEMORY_BUDGET = 256 * 1024 * 1024
+
+# Storms evaluated together in the indexed path
+INDEX_STORM_BATCH = 1000
+
+DEFAULT_VALUE = 1_000_000.0
+DEFAULT_CONSTRUCTION = "wood"
+
+def _is_blank(raw):
+    return raw is None or (isinstance(raw, str) and not raw.strip())
+
+def _number(raw, field, prop_id, limit=None):
+    """Finite float from a record field, optionally within ±limit"""
+    try:
+        number = float(raw)
+    except (TypeError, ValueError):
+        raise ValueError(f"{prop_id}: {field} {raw!r} is not a number") from None
+    if not np.isfinite(number):
+        raise ValueError(f"{prop_id}: {field} {raw!r} is not a finite number")
+    if limit is not None and abs(number) > limit:
+        raise ValueError(f"{prop_id}: {field} {raw!r} is outside ±{limit:g}")
+    return number
+
+def make_portfolio(records, default_value=DEFAULT_VALUE, default_construction=DEFAULT_CONSTRUCTION):
+    """Build portfolio arrays from dicts with lat, lon (or lng) and optional value/construction
+
+    value and construction fall back to the defaults only when missing or
+    empty. Raises ValueError, naming the property, for missing or invalid
+    coordinates and values.
+    """
+    ids, lat, lon, value, construction = [], [], [], [], []
+    for i, record in enumerate(records):
+        prop_id = str(record.get("id") or record.get("name") or f"P{i + 1:05d}")
+        ids.append(prop_id)
+        lon_field = "lng" if "lng" in record and "lon" not in record else "lon"
+        for field in ("lat", lon_field):
+            if _is_blank(record.get(field)):
+                raise ValueError(f"{prop_id}: missing {field}")
+        lat.append(_number(record["lat"], "lat", prop_id, 90.0))
+        lon.append(_number(record[lon_field], lon_field, prop_id, 180.0))
+        raw_value = record.get("value")
+        if _is_blank(raw_value):
+            value.append(float(default_value))
+        else:
+            value.append(_number(raw_value, "value", prop_id))
+            if value[-1] < 0:
+                raise ValueError(f"{prop_id}: value {raw_value!r} is negative")
+        raw_kind = record.get("construction")
+        kind = (default_construction if _is_blank(raw_kind) else str(raw_kind)).strip().lower()
+        if kind not in CONSTRUCTION_MULTIPLIERS:
+            raise ValueError(f"Unknown construction type {kind!r} for {prop_id}")
+        construction.append(CONSTRUCTION_TYPES.index(kind))
+    return {
+        "id": ids,
+        "lat": np.array(lat),
+        "lon": np.array(lon),
+        "value": np.array(value),
+        "construction": np.array(construction, dtype=np.uint8),
+    }
+
+def load_portfolio(path=None, **defaults):
+    """Load a portfolio from CSV/JSON, a portfolio store directory, or the
+    properties embedded in climate-scenarios.html"""
+    if path is None:
+        return make_portfolio(scenario_data.load_inline_properties(), **defaults)
+
+    path = Path(path)
+    if path.is_dir():
+        from portfolio_store import load_portfolio_store
+        return load_portfolio_store(path)
+    if path.suffix.lower() == ".csv":
+        with open(path, newline="") as f:
+            return make_portfolio(csv.DictReader(f), **defaults)
+    return make_portfolio(json.loads(path.read_text()), **defaults)
+
+def construction_multipliers(portfolio):
+    table = np.array([CONSTRUCTION_MULTIPLIERS[kind] for kind in CONSTRUCTION_TYPES])
+    return table[portfolio["construction"]]
+
+def wind_damage_ratio(wind_mph):
+    """Base damage ratio for a given wind speed, before distance and construction"""
+    return np.clip((wind_mph - DAMAGING_WIND) / (CAT5_WIND - DAMAGING_WIND), 0.0, 1.0) ** 2
+
+def tiers_from_band_counts(band_counts, rate_per_storm):
+    """Risk tier per property from per-band storm counts (bands x properties)
+
+    band_counts[b] counts the storms coming within TIER_BANDS[b] radii.
+    """
+    codes = np.zeros(band_counts.shape[1], dtype=np.uint8)
+    # Walk bands from least to most severe so the most severe hit wins
+    for counts, (_, tier) in reversed(list(zip(band_counts, TIER_BANDS))):
+        codes[counts * rate_per_storm >= TIER_ANNUAL_RATE] = TIERS.index(tier)
+    return codes
+
+def tier_codes(storm_ratio, storms_per_year):
+    """Risk tier per property from (properties x storms) closest-approach ratios"""
+    band_counts = np.array([(storm_ratio <= limit).sum(axis=1) for limit, _ in TIER_BANDS])
+    return tiers_from_band_counts(band_counts, storms_per_year / storm_ratio.shape[1])
+
+def storm_damage(lat, lon, ensemble):
+    """Per-storm damage ratio and closest approach for a chunk of properties
+
+    lat/lon are property coordinates in radians. Returns (damage, ratio), both
+    (properties x storms): the worst point damage along each track, and the
+    closest approach measured in storm radii.
+    """
+    lat = lat[:, None, None]
+    lon = lon[:, None, None]
+
+    # Haversine over the (properties x storms x points) block, computed in
+    # place to keep the number of full-size temporaries at two
+    hav = np.subtract(ensemble["lat_rad"][None], lat)
+    hav *= 0.5
+    np.sin(hav, out=hav)
+    hav *= hav
+    work = np.subtract(ensemble["lon_rad"][None], lon)
+    work *= 0.5
+    np.sin(work, out=work)
+    work *= work
+    work *= ensemble["cos_lat"][None]
+    work *= np.cos(lat)
+    hav += work
+    np.sqrt(hav, out=hav)
+    np.arcsin(hav, out=hav)
+
+    # arcsin gives half the central angle; scale it to storm radii
+    ratio = hav
+    ratio *= ensemble["nm_per_radius"][None]
+
+    damage = np.negative(ratio, out=work)
+    np.exp(damage, out=damage)
+    damage *= ensemble["intensity"][None]
+    damage[ratio > DAMAGE_CUTOFF] = 0.0
+    return damage.max(axis=2), ratio.min(axis=2)
+
+def prepare_ensemble(ensemble, dtype=np.float32):
+    """Precompute the per-point arrays the damage kernel needs"""
+    lat_rad = np.radians(ensemble["lat"])
+    return {
+        "lat_rad": lat_rad.astype(dtype),
+        "lon_rad": np.radians(ensemble["lon"]).astype(dtype),
+        "cos_lat": np.cos(lat_rad).astype(dtype),
+        # Half central angle -> distance in storm radii
+        "nm_per_radius": (2.0 * EARTH_RADIUS_NM / np.asarray(ensemble["radius_nm"])).astype(dtype),
+        "intensity": wind_damage_ratio(np.asarray(ensemble["wind_mph"])).astype(dtype),
+    }
+
+def assess_exposure(portfolio, ensemble, storms_per_year, memory_budget=MEMORY_BUDGET, index=None):
+    """Expected annual loss and risk tier for every property against an ensemble
+
+    Each storm in the ensemble represents storms_per_year / n_storms events
+    per year. Returns a dict with per-property expected_loss and tier codes
+    (indices into TIERS), and event_loss, the portfolio loss of each storm.
+
+    With a GridIndex over the portfolio (index=True builds one), only pairs
+    within DAMAGE_CUTOFF radii of a track point are evaluated, so the cost
+    follows the number of affected pairs instead of the full cross product.
+    """
+    if index is not None:
+        if index is True:
+            index = GridIndex(portfolio["lat"], portfolio["lon"])
+        return _assess_indexed(portfolio, ensemble, storms_per_year, index)
+
+    prepared = prepare_ensemble(ensemble)
+    n_storms, n_points = prepared["lat_rad"].shape
+    n_properties = len(portfolio["lat"])
+
+    # Two float32 (chunk x storms x points) blocks plus a boolean mask
+    bytes_per_property = n_storms * n_points * 9
+    chunk = max(1, min(n_properties, memory_budget // bytes_per_property))
+
+    lat = np.radians(portfolio["lat"]).astype(np.float32)
+    lon = np.radians(portfolio["lon"]).astype(np.float32)
+    value = portfolio["value"]
+    multiplier = construction_multipliers(portfolio)
+
+    expected_loss = np.zeros(n_properties)
+    tier = np.zeros(n_properties, dtype=np.uint8)
+    event_loss = np.zeros(n_storms)
+    rate_per_storm = storms_per_year / n_storms
+
+    for start in range(0, n_properties, chunk):
+        stop = min(start + chunk, n_properties)
+        damage, ratio = storm_damage(lat[start:stop], lon[start:stop], prepared)
+
+        loss = value[start:stop, None] * np.minimum(1.0, multiplier[start:stop, None] * damage)
+        expected_loss[start:stop] = loss.sum(axis=1) * rate_per_storm
+        event_loss += loss.sum(axis=0)
+        tier[start:stop] = tier_codes(ratio, storms_per_year)
+
+    return {"expected_loss": expected_loss, "tier": tier, "event_loss": event_loss}
+
+def _assess_indexed(portfolio, ensemble, storms_per_year, index):
+    """assess_exposure over candidate pairs from a spatial index"""
+    n_properties = len(portfolio["lat"])
+    lat = np.asarray(ensemble["lat"], dtype=float)
+    n_storms, n_points = lat.shape
+    rate_per_storm = storms_per_year / n_storms
+
+    value = portfolio["value"]
+    multiplier = construction_multipliers(portfolio)
+    prop_lat = np.radians(portfolio["lat"])
+    prop_lon = np.radians(portfolio["lon"])
+
+    expected_loss = np.zeros(n_properties)
+    event_loss = np.zeros(n_storms)
+    band_counts = np.zeros((len(TIER_BANDS), n_properties))
+
+    for first in range(0, n_storms, INDEX_STORM_BATCH):
+        last = min(first + INDEX_STORM_BATCH, n_storms)
+        point_lat = lat[first:last].ravel()
+        point_lon = np.asarray(ensemble["lon"], dtype=float)[first:last].ravel()
+        radius = np.asarray(ensemble["radius_nm"], dtype=float)[first:last].ravel()
+        intensity = wind_damage_ratio(np.asarray(ensemble["wind_mph"], dtype=float)[first:last].ravel())
+
+        prop, point = index.query_pairs(point_lat, point_lon, radius * DAMAGE_CUTOFF)
+        ratio = haversine_nm(prop_lat[prop], prop_lon[prop],
+                             np.radians(point_lat[point]), np.radians(point_lon[point])) / radius[point]
+        near = ratio <= DAMAGE_CUTOFF
+        prop, point, ratio = prop[near], point[near], ratio[near]
+        damage = intensity[point] * np.exp(-ratio)
+
+        # Reduce track points to one (property, storm) pair
+        pair_key = prop * (last - first) + point // n_points
+        pair_key, pair = np.unique(pair_key, return_inverse=True)
+        pair_damage = np.zeros(len(pair_key))
+        pair_ratio = np.full(len(pair_key), np.inf)
+        np.maximum.at(pair_damage, pair, damage)
+        np.minimum.at(pair_ratio, pair, ratio)
+        pair_prop = pair_key // (last - first)
+        pair_storm = pair_key % (last - first)
+
+        loss = value[pair_prop] * np.minimum(1.0, multiplier[pair_prop] * pair_damage)
+        expected_loss += np.bincount(pair_prop, loss, minlength=n_properties) * rate_per_storm
+        event_loss[first:last] += np.bincount(pair_storm, loss, minlength=last - first)
+        for band, (limit, _) in enumerate(TIER_BANDS):
+            band_counts[band] += np.bincount(pair_prop[pair_ratio <= limit], minlength=n_properties)
+
+    tier = tiers_from_band_counts(band_counts, rate_per_storm)
+    return {"expected_loss": expected_loss, "tier": tier, "event_loss": event_loss}
+
+def summarize(portfolio, result):
+    """Portfolio totals: expected loss and count/value in each tier"""
+    summary = {
+        "properties": len(portfolio["lat"]),
+        "total_value": float(portfolio["value"].sum()),
+        "expected_annual_loss": float(result["expected_loss"].sum()),
+        "tiers": {},
+    }
+    for code, tier in enumerate(TIERS):
+        mask = result["tier"] == code
+        summary["tiers"][tier] = {
+            "count": int(mask.sum()),
+            "value": float(portfolio["value"][mask].sum()),
+            "expected_loss": float(result["expected_loss"][mask].sum()),
+        }
+    return summary
+
+def write_results(path, portfolio, result):
+    """Per-property results as CSV"""
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "lat", "lon", "value", "construction", "tier", "expected_loss"])
+        for i, prop_id in enumerate(portfolio["id"]):
+            writer.writerow([
+                prop_id, portfolio["lat"][i], portfolio["lon"][i], portfolio["value"][i],
+                CONSTRUCTION_TYPES[portfolio["construction"][i]],
+                TIERS[result["tier"][i]], round(float(result["expected_loss"][i]), 2),
+            ])
+
+class ScoreResult:
+    """Summary plus pre-encoded NDJSON rows of one scored portfolio"""
+
+    def __init__(self, header, rows, count):
+        self.header = header
+        self.rows = rows
+        self.count = count
+
+    @property
+    def size(self):
+        return len(self.rows)
+
+    def json_body(self):
+        # Rows are one JSON object per line with no raw newlines inside
+        results = b"[" + self.rows[:-1].replace(b"\n", b",") + b"]" if self.rows else b"[]"
+        return json.dumps(self.header)[:-1].encode() + b',"results":' + results + b"}"
+
+def parse_portfolio_records(body, content_type):
+    """Property records from a CSV body, or a JSON array / {"properties": [...]}"""
+    text = body.decode("utf-8-sig")
+    if "csv" in content_type:
+        return list(csv.DictReader(io.StringIO(text)))
+    records = json.loads(text)
+    if isinstance(records, dict):
+        records = records.get("properties", records.get("portfolio"))
+    if not isinstance(records, list):
+        raise ValueError("expected a JSON array of properties")
+    for row, record in enumerate(records, 1):
+        if not isinstance(record, dict):
+            raise ValueError(f"property {row} is not a JSON object")
+    return records
+
+def score_portfolio(body, content_type, stats, scenario, decade, storms, seed):
+    """Risk tiers and expected annual loss for a posted portfolio
+
+    Worker for the scoring API in simple-deploy.py; it runs in a process pool,
+    so arguments and the ScoreResult travel by pickle. stats is the
+    scenario/decade entry from scenario_data.load_scenarios(). Raises
+    ValueError, naming the property, for an empty or invalid portfolio.
+    """
+    portfolio = make_portfolio(parse_portfolio_records(body, content_type))
+    if not portfolio["id"]:
+        raise ValueError("portfolio is empty")
+
+    if storms:
+        rng = storm_synthesis.ensemble_rng(seed, scenario, decade)
+        ensemble = storm_synthesis.synthesize_storms(stats["avg_wind"], storms, rng)
+    else:
+        ensemble = storm_synthesis.from_sample_storms(stats["sample_storms"])
+
+    result = assess_exposure(portfolio, ensemble, stats["storms_per_year"], index=True)
+    summary = summarize(portfolio, result)
+    tiers = [TIERS[code] for code in result["tier"].tolist()]
+    losses = result["expected_loss"].round(2).tolist()
+    rows = "".join(
+        json.dumps({"id": prop_id, "tier": tier, "expected_loss": loss}) + "\n"
+        for prop_id, tier, loss in zip(portfolio["id"], tiers, losses)
+    ).encode()
+    header = {
+        "scenario": scenario,
+        "decade": decade,
+        "storms": len(ensemble["max_wind"]),
+        "seed": seed if storms else None,
+        "summary": summary,
+    }
+    return ScoreResult(header, rows, len(tiers))
+
+def main():
+    parser = argparse.ArgumentParser(description="Assess portfolio exposure to a storm ensemble")
+    parser.add_argument("--portfolio", help="CSV/JSON portfolio or store directory (default: climate-scenarios.html properties)")
+    parser.add_argument("--scenario", default="baseline")
+    parser.add_argument("--decade", default="2020s")
+    parser.add_argument("--storms", type=int, default=0,
+                        help="synthesize this many storms (default: the page's sample storms)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--index", action="store_true",
+                        help="prune property-storm pairs with a spatial grid index")
+    parser.add_argument("--out", help="write per-property results to this CSV")
+    args = parser.parse_args()
+
+    portfolio = load_portfolio(args.portfolio)
+    scenarios = scenario_data.load_scenarios()
+    stats = scenarios[args.scenario][args.decade]
+
+    if args.storms:
+        rng = storm_synthesis.ensemble_rng(args.seed, args.scenario, args.decade)
+        ensemble = storm_synthesis.synthesize_storms(stats["avg_wind"], args.storms, rng)
+    else:
+        ensemble = storm_synthesis.from_sample_storms(stats["sample_storms"])
+
+    print(f"🏠 Assessing {len(portfolio['lat']):,} properties against "
+          f"{len(ensemble['max_wind']):,} storms ({args.scenario} {args.decade})...")
+    result = assess_exposure(portfolio, ensemble, stats["storms_per_year"],
+                             index=True if args.index else None)
+    summary = summarize(portfolio, result)
+
+    print(f"💰 Expected annual loss: ${summary['expected_annual_loss']:,.0f}")
+    for tier in reversed(TIERS):
+        entry = summary["tiers"][tier]
+        print(f"   • {tier:<9} {entry['count']:>8,} properties  ${entry['expected_loss']:,.0f}")
+
+    if args.out:
+        write_results(args.out, portfolio, result)
+        print(f"✅ Results written to {args.out}")
+
+if __name__ == "__main__":
+    main()
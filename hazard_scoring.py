@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Hazard re-scoring engine for real-estate-risk.html
+Keeps per-location, per-hazard partial scores as a matrix so weighting,
+horizon and confidence changes update composite scores with one
+matrix-vector product (or one column for a single weight) and precomputes
+every control combination the page offers
+"""
+
+import argparse
+import json
+import re
+from pathlib import Path
+from statistics import NormalDist
+
+import numpy as np
+
+import atomic_files
+import portfolio_store
+import scenario_data
+
+SCORES_PATH = Path("public/data/hazard-scores.json")
+SCORES_FORMAT = 1
+
+_HAZARDS_BLOCK = re.compile(r"const climateRiskData = \{\s*hazards: (\{.*?\}\s*\}),", re.DOTALL)
+
+# climateRiskData.hazards gives `current` (2025) and `projected` (2050)
+# levels; other years are interpolated linearly
+BASE_YEAR = 2025
+TARGET_YEAR = 2050
+
+# The page's timeHorizon and confidence options
+HORIZONS = (2030, 2040, 2050)
+CONFIDENCE_LEVELS = (90, 95, 99)
+
+# Standard deviation of a projected hazard level as a share of the level,
+# reached at TARGET_YEAR and growing linearly from zero at BASE_YEAR
+PROJECTION_CV = 0.25
+
+# Loss share used for CVaR, as in the page's marker popups
+CVAR_LOSS_SHARE = 0.15
+
+# Delta updates between full recomputes, bounding float drift
+REFRESH_EVERY = 64
+
+def load_inline_hazards(page=portfolio_store.RISK_PAGE):
+    """Read climateRiskData.hazards from real-estate-risk.html"""
+    match = _HAZARDS_BLOCK.search(Path(page).read_text(encoding="utf-8"))
+    if match is None:
+        raise ValueError(f"No climateRiskData.hazards object found in {page}")
+    return scenario_data.parse_js_literal(match.group(1))
+
+def weighting_schemes(hazards):
+    """Weights per hazard for each option of the page's weightingScheme control"""
+    names = list(hazards)
+    schemes = {
+        "equal": [1.0] * len(names),
+        "impact": [hazards[h]["projected"] for h in names],
+        "frequency": [hazards[h]["current"] for h in names],
+        "custom": [hazards[h]["weight"] for h in names],
+    }
+    # An all-zero scheme stays all zero; the scorer gives it zero scores
+    return {scheme: (np.array(w, dtype=float) / (sum(w) or 1.0)).tolist() for scheme, w in schemes.items()}
+
+def hazard_levels(hazards, years):
+    """(years x hazards) hazard levels interpolated between current and projected"""
+    current = np.array([h["current"] for h in hazards.values()], dtype=float)
+    projected = np.array([h["projected"] for h in hazards.values()], dtype=float)
+    t = (np.asarray(years, dtype=float)[:, None] - BASE_YEAR) / (TARGET_YEAR - BASE_YEAR)
+    return current + (projected - current) * t
+
+def worst_level(hazards):
+    """Highest current or projected level of any hazard, the 100-point reference"""
+    return max(max(h["current"], h["projected"]) for h in hazards.values())
+
+def vulnerability(locations, hazards):
+    """(locations x hazards) vulnerability, 0-100
+
+    Uses a numeric column per hazard when the locations carry one, and each
+    location's overall `risk` for every hazard otherwise.
+    """
+    names = list(hazards)
+    if all(name in locations for name in names):
+        return np.column_stack([np.asarray(locations[name], dtype=np.float32) for name in names])
+    risk = np.asarray(locations["risk"], dtype=np.float32)
+    return np.repeat(risk[:, None], len(names), axis=1)
+
+class HazardScorer:
+    """Composite scores for one portfolio under changing weights and horizons
+
+    matrix is the (locations x hazards) vulnerability from vulnerability().
+
+    partial[y, h] holds hazard h's score for every location at horizon y,
+    vulnerability x hazard level / worst_level (hazard-major, so one hazard
+    is a contiguous row), and variance[y, h] its variance. A location
+    scores its full vulnerability (0-100) when every weighted hazard is at
+    the worst level in climateRiskData. The running numerators are
+    float64; the composite is numerator / sum(weights), and 0 when every
+    weight is 0 (nothing is weighted, so nothing scores).
+    """
+
+    def __init__(self, matrix, hazards, horizons=HORIZONS, confidence_levels=CONFIDENCE_LEVELS):
+        self.hazards = list(hazards)
+        self.horizons = list(horizons)
+        self.confidence_levels = list(confidence_levels)
+        self.z = {c: NormalDist().inv_cdf(c / 100) for c in self.confidence_levels}
+
+        levels = hazard_levels(hazards, self.horizons) / worst_level(hazards)
+        spread = PROJECTION_CV * (np.asarray(self.horizons, dtype=float) - BASE_YEAR) / (TARGET_YEAR - BASE_YEAR)
+
+        by_hazard = np.ascontiguousarray(np.asarray(matrix, dtype=np.float32).T)
+        self.partial = (levels[:, :, None] * by_hazard[None]).astype(np.float32)
+        self.variance = np.square(self.partial * spread[:, None, None].astype(np.float32))
+
+        self.horizon = len(self.horizons) - 1
+        self.weights = np.ones(len(self.hazards)) / len(self.hazards)
+        self.recompute()
+
+    def recompute(self):
+        """Full refresh: one product per numerator"""
+        self.numerator = self.weights @ self.partial[self.horizon]
+        self.var_numerator = np.square(self.weights) @ self.variance[self.horizon]
+        self._deltas = 0
+
+    def set_weights(self, weights):
+        self.weights = np.asarray(weights, dtype=float).copy()
+        self.recompute()
+
+    def set_weight(self, hazard, weight):
+        """Change one hazard's weight, updating only that hazard's contribution"""
+        h = self.hazards.index(hazard) if isinstance(hazard, str) else hazard
+        old = self.weights[h]
+        self.weights[h] = weight
+        self._deltas += 1
+        if self._deltas >= REFRESH_EVERY:
+            self.recompute()
+            return
+        self.numerator += (weight - old) * self.partial[self.horizon, h]
+        self.var_numerator += (weight ** 2 - old ** 2) * self.variance[self.horizon, h]
+
+    def set_horizon(self, year):
+        self.horizon = self.horizons.index(int(year))
+        self.recompute()
+
+    def scores(self, confidence=None):
+        """Composite score per location, or its one-sided upper bound at confidence (%)"""
+        total = self.weights.sum()
+        if total == 0:
+            # Delta updates can leave float residue in the numerators
+            return np.zeros(self.numerator.shape)
+        composite = self.numerator / total
+        if confidence is not None:
+            composite = composite + self.z[int(confidence)] * np.sqrt(np.maximum(self.var_numerator, 0)) / total
+        return np.clip(composite, 0.0, 100.0)
+
+    def table(self, weights):
+        """{horizon: (composite, {confidence: upper bound})} for one weight vector
+
+        All horizons at once: (hazards) x (horizons, hazards, locations).
+        """
+        weights = np.asarray(weights, dtype=float)
+        # All-zero weights score every location 0 instead of 0 / 0
+        total = weights.sum() or 1.0
+        composite = np.einsum("h,yhl->yl", weights, self.partial) / total
+        sd = np.sqrt(np.einsum("h,yhl->yl", np.square(weights), self.variance)) / total
+        return {
+            year: (np.clip(composite[y], 0, 100),
+                   {c: np.clip(composite[y] + self.z[c] * sd[y], 0, 100) for c in self.confidence_levels})
+            for y, year in enumerate(self.horizons)
+        }
+
+def _round(values):
+    return np.round(values, 2).tolist()
+
+def build_scores(locations, hazards):
+    """Every weighting x horizon x confidence combination for the page"""
+    scorer = HazardScorer(vulnerability(locations, hazards), hazards)
+    schemes = weighting_schemes(hazards)
+    value = np.asarray(locations["value"], dtype=float)
+    scores = {}
+    for scheme, weights in schemes.items():
+        scores[scheme] = {}
+        for year, (composite, upper) in scorer.table(weights).items():
+            scores[scheme][str(year)] = {
+                "composite": _round(composite),
+                "upper": {str(c): _round(bound) for c, bound in upper.items()},
+                "cvar": {str(c): round(float(value @ bound) / 100 * CVAR_LOSS_SHARE, 2)
+                         for c, bound in upper.items()},
+            }
+    return {
+        "format": SCORES_FORMAT,
+        "hazards": scorer.hazards,
+        "horizons": scorer.horizons,
+        "confidence_levels": scorer.confidence_levels,
+        "cvar_loss_share": CVAR_LOSS_SHARE,
+        "weights": schemes,
+        "locations": [str(name) for name in locations["id"]],
+        "scores": scores,
+    }
+
+def write_scores(report, path=SCORES_PATH):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return atomic_files.write_text(path, json.dumps(report, separators=(",", ":")))
+
+def load_locations(path=None):
+    """Locations with id, value and risk (or per-hazard) columns
+
+    Defaults to climateRiskData.locations; a portfolio store directory
+    (portfolio_store.py) works for large portfolios.
+    """
+    if path is not None:
+        return portfolio_store.load_portfolio_store(path)
+    records = portfolio_store.load_inline_locations()
+    return {
+        "id": [record["name"] for record in records],
+        "value": [record["value"] for record in records],
+        "risk": [record["risk"] for record in records],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute composite hazard scores for real-estate-risk.html")
+    parser.add_argument("--portfolio", help="portfolio store directory with a risk column "
+                                            "(default: climateRiskData.locations)")
+    parser.add_argument("--out", default=str(SCORES_PATH))
+    args = parser.parse_args()
+
+    hazards = load_inline_hazards()
+    locations = load_locations(args.portfolio)
+    print(f"🧮 Scoring {len(locations['id']):,} locations x {len(hazards)} hazards "
+          f"({len(HORIZONS)} horizons x {len(CONFIDENCE_LEVELS)} confidence levels)...")
+    report = build_scores(locations, hazards)
+    path = write_scores(report, args.out)
+    print(f"✅ {len(report['scores'])} weighting schemes written to {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Columnar portfolio and storm-track store
+Keeps every field as one contiguous typed .npy column (float32 coordinates and
+winds, integer ids, categorical construction codes) so analysis stages can
+memory-map a million-property portfolio instead of parsing JS object literals
+"""
+
+import argparse
+import csv
+import json
+import re
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+import atomic_files
+import exposure_engine
+import scenario_data
+
+STORE_DIR = Path(".build-cache/stores")
+STORE_FORMAT = 1
+
+RISK_PAGE = Path("public/real-estate-risk.html")
+_LOCATIONS_BLOCK = re.compile(r"const climateRiskData = \{.*?locations: (\[.*?\])", re.DOTALL)
+
+# Fields make_portfolio already turns into columns
+PORTFOLIO_FIELDS = {"id", "name", "lat", "lon", "lng", "value", "construction"}
+
+TRACK_FIELDS = tuple(scenario_data.COLUMNS)
+
+class Labels:
+    """Sequence of strings backed by a fixed-width bytes column
+
+    Decodes one label at a time, so a memory-mapped id column is never
+    materialized as a list of Python strings.
+    """
+
+    def __init__(self, data):
+        self.data = data
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, i):
+        if isinstance(i, (slice, np.ndarray, list)):
+            return Labels(self.data[i])
+        return self.data[i].decode("utf-8")
+
+    def __iter__(self):
+        for label in self.data:
+            yield label.decode("utf-8")
+
+def load_inline_locations(page=RISK_PAGE):
+    """Read climateRiskData.locations from real-estate-risk.html"""
+    match = _LOCATIONS_BLOCK.search(Path(page).read_text(encoding="utf-8"))
+    if match is None:
+        raise ValueError(f"No climateRiskData.locations array found in {page}")
+    return scenario_data.parse_js_literal(match.group(1))
+
+def read_records(source=None):
+    """Property records from a CSV/JSON file, or "scenarios"/"risk" for the inline page data"""
+    if source in (None, "scenarios"):
+        return scenario_data.load_inline_properties()
+    if source == "risk":
+        return load_inline_locations()
+    path = Path(source)
+    if path.suffix.lower() == ".csv":
+        with open(path, newline="") as f:
+            return list(csv.DictReader(f))
+    return json.loads(path.read_text())
+
+def encode_labels(labels):
+    """Fixed-width UTF-8 bytes column (memory-mappable, unlike object arrays)"""
+    return np.array([str(label).encode("utf-8") for label in labels], dtype=np.bytes_)
+
+def portfolio_columns(records, **defaults):
+    """Typed columns for a list of property records
+
+    Other numeric fields present on every record (e.g. risk) are kept as
+    float32 columns.
+    """
+    records = list(records)
+    portfolio = exposure_engine.make_portfolio(records, **defaults)
+    columns = {
+        "id": np.arange(len(records), dtype=np.int64),
+        "label": encode_labels(portfolio["id"]),
+        "lat": portfolio["lat"].astype(np.float32),
+        "lon": portfolio["lon"].astype(np.float32),
+        "value": portfolio["value"],
+        "construction": portfolio["construction"],
+    }
+    extra = set(records[0]) - PORTFOLIO_FIELDS if records else set()
+    for field in sorted(extra):
+        values = [record.get(field) for record in records]
+        if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+            columns[field] = np.array(values, dtype=np.float32)
+    return columns
+
+def track_columns(scenarios):
+    """CSR-style track columns for every scenario/decade's sample storms
+
+    Per-storm columns (scenario, decade, label, max_wind) index into the
+    per-point columns through offsets: storm i owns points
+    offsets[i]:offsets[i + 1].
+    """
+    names = {"scenario": [], "decade": []}
+    storm_scenario, storm_decade, labels, max_wind, lengths = [], [], [], [], []
+    points = {field: [] for field in TRACK_FIELDS}
+    for scenario, entry in scenarios.items():
+        for decade, data in entry.items():
+            if decade == "name":
+                continue
+            storms = data.get("sample_storms", [])
+            if not storms:
+                continue
+            for kind, value in (("scenario", scenario), ("decade", decade)):
+                if value not in names[kind]:
+                    names[kind].append(value)
+            for storm in storms:
+                storm_scenario.append(names["scenario"].index(scenario))
+                storm_decade.append(names["decade"].index(decade))
+                labels.append(storm.get("name", f"Storm_{len(labels) + 1}"))
+                max_wind.append(storm["max_wind"])
+                lengths.append(len(storm["track"]))
+                for field in TRACK_FIELDS:
+                    points[field].extend(point[field] for point in storm["track"])
+
+    columns = {
+        "scenario": np.array(storm_scenario, dtype=np.uint8),
+        "decade": np.array(storm_decade, dtype=np.uint8),
+        "label": encode_labels(labels),
+        "max_wind": np.array(max_wind, dtype=np.float32),
+        "offsets": np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)]),
+    }
+    for field in TRACK_FIELDS:
+        columns[field] = np.array(points[field], dtype=np.float32)
+    return columns, names
+
+def write_store(path, kind, columns, categories=None):
+    """Write one .npy per column plus meta.json, replacing any previous store"""
+    path = Path(path)
+    tmp_dir = path.with_name(f".{path.name}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    for name, column in columns.items():
+        np.save(tmp_dir / f"{name}.npy", np.ascontiguousarray(column), allow_pickle=False)
+    atomic_files.write_text(tmp_dir / "meta.json", json.dumps({
+        "format": STORE_FORMAT,
+        "kind": kind,
+        "columns": {name: {"dtype": column.dtype.str, "length": len(column)}
+                    for name, column in columns.items()},
+        "categories": categories or {},
+    }, indent=1))
+
+    return atomic_files.replace_dir(tmp_dir, path)
+
+def open_store(path, kind=None, mmap_mode="r"):
+    """(columns, meta) for a store; columns are read-only memory maps by default"""
+    path = Path(path)
+    meta = json.loads((path / "meta.json").read_text())
+    if meta.get("format") != STORE_FORMAT:
+        raise ValueError(f"Unsupported store format {meta.get('format')!r} in {path}")
+    if kind is not None and meta["kind"] != kind:
+        raise ValueError(f"{path} is a {meta['kind']} store, expected {kind}")
+    columns = {
+        name: np.load(path / f"{name}.npy", mmap_mode=mmap_mode, allow_pickle=False)
+        for name in meta["columns"]
+    }
+    return columns, meta
+
+def write_portfolio(path, records, **defaults):
+    columns = portfolio_columns(records, **defaults)
+    return write_store(path, "portfolio", columns,
+                       {"construction": list(exposure_engine.CONSTRUCTION_TYPES)})
+
+def load_portfolio_store(path, mmap_mode="r"):
+    """Portfolio dict in the exposure_engine layout, backed by the store's columns
+
+    `id` holds the decoded labels as in make_portfolio and the integer ids
+    move to `row`; extra columns (risk, ...) are passed through.
+    """
+    columns, meta = open_store(path, "portfolio", mmap_mode)
+    construction = columns["construction"]
+    stored = meta["categories"]["construction"]
+    if stored != list(exposure_engine.CONSTRUCTION_TYPES):
+        remap = np.array([exposure_engine.CONSTRUCTION_TYPES.index(kind) for kind in stored], dtype=np.uint8)
+        construction = remap[construction]
+
+    portfolio = dict(columns)
+    portfolio["row"] = portfolio.pop("id")
+    portfolio["id"] = Labels(portfolio.pop("label"))
+    portfolio["construction"] = construction
+    return portfolio
+
+def write_tracks(path, scenarios=None):
+    columns, names = track_columns(scenarios if scenarios is not None else scenario_data.load_scenarios())
+    return write_store(path, "tracks", columns, names)
+
+def select_storms(columns, meta, scenario=None, decade=None):
+    """Indices of the storms in one scenario and/or decade"""
+    mask = np.ones(len(columns["max_wind"]), dtype=bool)
+    for kind, value in (("scenario", scenario), ("decade", decade)):
+        if value is not None:
+            names = meta["categories"][kind]
+            if value not in names:
+                return np.zeros(0, dtype=np.int64)
+            mask &= columns[kind] == names.index(value)
+    return np.flatnonzero(mask)
+
+def track_ensemble(columns, storms=None):
+    """Ensemble arrays (storms x points) for exposure_engine from CSR tracks
+
+    Shorter tracks are padded by repeating their last point, as in
+    storm_synthesis.from_sample_storms.
+    """
+    offsets = np.asarray(columns["offsets"])
+    if storms is None:
+        storms = np.arange(len(offsets) - 1)
+    start = offsets[storms]
+    length = offsets[np.asarray(storms) + 1] - start
+    n_points = int(length.max()) if len(length) else 0
+    gather = start[:, None] + np.minimum(np.arange(n_points), length[:, None] - 1)
+
+    ensemble = {"max_wind": np.asarray(columns["max_wind"][storms], dtype=float)}
+    for field in TRACK_FIELDS:
+        ensemble[field] = columns[field][gather]
+    return ensemble
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and inspect columnar portfolio/track stores")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("portfolio", help="write a portfolio store")
+    build.add_argument("--source", help='CSV/JSON file, "scenarios" (climate-scenarios.html, default) '
+                                        'or "risk" (real-estate-risk.html)')
+    build.add_argument("--out", default=str(STORE_DIR / "portfolio"))
+
+    tracks = commands.add_parser("tracks", help="write a track store from the scenario datasets")
+    tracks.add_argument("--out", default=str(STORE_DIR / "tracks"))
+
+    info = commands.add_parser("info", help="describe a store")
+    info.add_argument("path")
+    args = parser.parse_args()
+
+    if args.command == "portfolio":
+        records = read_records(args.source)
+        path = write_portfolio(args.out, records)
+        print(f"✅ {len(records):,} properties → {path}")
+    elif args.command == "tracks":
+        path = write_tracks(args.out)
+        columns, _ = open_store(path)
+        print(f"✅ {len(columns['max_wind']):,} storms, {len(columns['lat']):,} track points → {path}")
+    else:
+        columns, meta = open_store(args.path)
+        print(f"📦 {args.path}: {meta['kind']} store")
+        for name, column in columns.items():
+            print(f"   {name:<14} {column.dtype.str:<6} {len(column):>12,} rows {column.nbytes:>14,} bytes")
+
+if __name__ == "__main__":
+    main()
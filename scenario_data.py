@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Scenario dataset build stage for climate-scenarios.html
+Moves the storm tracks out of the page into compact per-scenario/decade files
+that the page fetches on demand
+"""
+
+import argparse
+import json
+import re
+from pathlib import Path
+
+import atomic_files
+
+SCENARIOS_PAGE = Path("public/climate-scenarios.html")
+SCENARIO_DATA_DIR = Path("public/data/scenarios")
+
+SLICE_FORMAT = 1
+
+# Quantization steps: 1e-4 degrees (~11 m), 0.1 mph, 0.1 nm
+SCALES = {"lat": 10000, "lon": 10000, "wind_mph": 10, "radius_nm": 10}
+
+# Short column names used in the slice files
+COLUMNS = {"lat": "lat", "lon": "lon", "wind_mph": "wind", "radius_nm": "radius"}
+
+_SCENARIOS_LINE = re.compile(r"^(\s*const scenarios = )(\{.*\});$", re.MULTILINE)
+_PROPERTIES_BLOCK = re.compile(r"const properties = (\[.*?\]);", re.DOTALL)
+_BARE_KEY = re.compile(r"([{,]\s*)([A-Za-z_]\w*)\s*:")
+
+def load_inline_scenarios(page=SCENARIOS_PAGE):
+    """Read the `scenarios` object embedded in the page"""
+    match = _SCENARIOS_LINE.search(Path(page).read_text(encoding="utf-8"))
+    if match is None:
+        raise ValueError(f"No inline scenarios object found in {page}")
+    return json.loads(match.group(2))
+
+def parse_js_literal(text):
+    """Parse a JS object/array literal with bare keys and double-quoted strings"""
+    # JS object literal -> JSON: quote the bare keys
+    return json.loads(_BARE_KEY.sub(r'\1"\2":', text))
+
+def load_inline_properties(page=SCENARIOS_PAGE):
+    """Read the `properties` array literal embedded in the page"""
+    match = _PROPERTIES_BLOCK.search(Path(page).read_text(encoding="utf-8"))
+    if match is None:
+        raise ValueError(f"No inline properties array found in {page}")
+    return parse_js_literal(match.group(1))
+
+def encode_column(values, scale):
+    """Quantize values and delta-encode them as integers"""
+    encoded = []
+    previous = 0
+    for value in values:
+        quantized = round(value * scale)
+        encoded.append(quantized - previous)
+        previous = quantized
+    return encoded
+
+def decode_column(deltas, scale):
+    """Inverse of encode_column"""
+    values = []
+    total = 0
+    for delta in deltas:
+        total += delta
+        values.append(total / scale)
+    return values
+
+def encode_storm(storm):
+    encoded = {
+        "name": storm["name"],
+        "max_wind": round(storm["max_wind"] * SCALES["wind_mph"]) / SCALES["wind_mph"],
+    }
+    for field, column in COLUMNS.items():
+        encoded[column] = encode_column([p[field] for p in storm["track"]], SCALES[field])
+    return encoded
+
+def decode_storm(encoded):
+    """Rebuild the {name, max_wind, track} shape that drawStorms consumes"""
+    columns = {
+        field: decode_column(encoded[column], SCALES[field])
+        for field, column in COLUMNS.items()
+    }
+    track = [dict(zip(columns, point)) for point in zip(*columns.values())]
+    return {"name": encoded["name"], "track": track, "max_wind": encoded["max_wind"]}
+
+def slice_path(scenario, decade, data_dir=SCENARIO_DATA_DIR):
+    return Path(data_dir) / scenario / f"{decade}.json"
+
+def split_scenarios(scenarios):
+    """Split the full dataset into a stats-only index and per-decade storm lists"""
+    index = {}
+    storms = {}
+    for scenario, entry in scenarios.items():
+        index[scenario] = {"name": entry["name"]}
+        for decade, data in entry.items():
+            if decade == "name":
+                continue
+            index[scenario][decade] = {k: v for k, v in data.items() if k != "sample_storms"}
+            storms[(scenario, decade)] = data.get("sample_storms", [])
+    return index, storms
+
+def load_scenarios(page=SCENARIOS_PAGE, data_dir=SCENARIO_DATA_DIR):
+    """Load the full scenarios dataset, wherever the storm tracks currently live
+
+    Pages that still embed sample_storms are read as-is; otherwise the tracks
+    are decoded from the extracted slice files.
+    """
+    scenarios = load_inline_scenarios(page)
+    for scenario, entry in scenarios.items():
+        for decade, data in entry.items():
+            if decade == "name" or "sample_storms" in data:
+                continue
+            path = slice_path(scenario, decade, data_dir)
+            if path.exists():
+                encoded = json.loads(path.read_text())
+                data["sample_storms"] = [decode_storm(s) for s in encoded["storms"]]
+    return scenarios
+
+def write_slice(scenario, decade, storms, data_dir=SCENARIO_DATA_DIR):
+    """Write one scenario/decade slice in the compact format"""
+    path = slice_path(scenario, decade, data_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {
+        "format": SLICE_FORMAT,
+        "scale": {COLUMNS[field]: scale for field, scale in SCALES.items()},
+        "storms": [encode_storm(s) for s in storms],
+    }
+    return atomic_files.write_text(path, json.dumps(payload, separators=(",", ":")))
+
+def write_inline_index(index, page=SCENARIOS_PAGE):
+    """Replace the page's inline scenarios object with the stats-only index"""
+    page = Path(page)
+    content = page.read_text(encoding="utf-8")
+    content, count = _SCENARIOS_LINE.subn(
+        lambda m: m.group(1) + json.dumps(index) + ";", content, count=1
+    )
+    if count == 0:
+        raise ValueError(f"No inline scenarios object found in {page}")
+    atomic_files.write_text(page, content)
+
+def extract_scenarios(page=SCENARIOS_PAGE, data_dir=SCENARIO_DATA_DIR):
+    """Move the storm tracks out of the page into per-scenario/decade files"""
+    page = Path(page)
+    before = page.stat().st_size
+
+    index, storms = split_scenarios(load_scenarios(page, data_dir))
+    for (scenario, decade), sample_storms in storms.items():
+        path = write_slice(scenario, decade, sample_storms, data_dir)
+        print(f"📦 {path} ({path.stat().st_size:,} bytes, {len(sample_storms)} storms)")
+
+    write_inline_index(index, page)
+    print(f"✅ {page.name}: {before:,} → {page.stat().st_size:,} bytes")
+    return index
+
+def main():
+    parser = argparse.ArgumentParser(description="Move storm tracks out of climate-scenarios.html into slice files")
+    parser.add_argument("--page", default=str(SCENARIOS_PAGE), help="scenario page to read and rewrite")
+    parser.add_argument("--data-dir", default=str(SCENARIO_DATA_DIR),
+                        help="directory for the <scenario>/<decade>.json slices")
+    args = parser.parse_args()
+
+    print(f"🚀 Extracting scenario datasets from {Path(args.page).name}...")
+    extract_scenarios(args.page, args.data_dir)
+
+if __name__ == "__main__":
+    main()
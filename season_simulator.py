@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Monte Carlo hurricane season simulator
+Draws many seasons per scenario/decade across a process pool and reduces them
+as a stream into an event-loss table, average annual loss and PML/exceedance
+curves; individual seasons are never kept in memory
+"""
+
+import argparse
+import json
+import math
+import os
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+import atomic_files
+import exposure_engine
+import scenario_data
+import storm_synthesis
+from spatial_index import GridIndex
+
+SEASON_DIR = Path("public/data/seasons")
+REPORT_FORMAT = 1
+
+DEFAULT_SEASONS = 10000
+# Seasons per work unit. Each chunk has its own seed, so results depend on
+# the seed and chunk size but not on how many workers run the chunks.
+CHUNK_SEASONS = 1000
+
+# Saffir-Simpson category 3+
+MAJOR_WIND = 111.0
+# Resampling rounds before peak winds are clipped into their class
+MAX_RESAMPLE = 20
+
+# Log-spaced loss bins: $1K to $1T, 20 per decade (edges ~12% apart)
+LOSS_MIN = 1e3
+LOSS_DECADES = 9
+BINS_PER_DECADE = 20
+LOSS_EDGES = np.concatenate([[0.0], LOSS_MIN * np.logspace(0, LOSS_DECADES, LOSS_DECADES * BINS_PER_DECADE + 1)])
+
+# Largest season losses kept exactly for tail PMLs
+TAIL_SEASONS = 1000
+
+RETURN_PERIODS = (10, 25, 50, 100, 250, 500, 1000)
+
+def loss_bins(losses):
+    """Bin index of each loss; bin 0 holds losses below LOSS_MIN"""
+    return np.clip(np.searchsorted(LOSS_EDGES, losses, side="right") - 1, 0, len(LOSS_EDGES) - 1)
+
+def chunk_rng(seed, scenario, decade, chunk):
+    key = zlib.crc32(f"{scenario}/{decade}".encode())
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(key, chunk)))
+
+def peak_winds(rng, avg_wind, major):
+    """Peak winds around avg_wind, constrained to each storm's major/minor class"""
+    wind = rng.normal(avg_wind, storm_synthesis.WIND_SPREAD, size=len(major))
+    for _ in range(MAX_RESAMPLE):
+        wrong = (wind >= MAJOR_WIND) != major
+        if not wrong.any():
+            break
+        wind[wrong] = rng.normal(avg_wind, storm_synthesis.WIND_SPREAD, size=int(wrong.sum()))
+    wind = np.where(major, np.maximum(wind, MAJOR_WIND), np.minimum(wind, np.nextafter(MAJOR_WIND, 0)))
+    return np.clip(wind, storm_synthesis.MIN_WIND, storm_synthesis.MAX_WIND)
+
+def simulate_chunk(portfolio, index, stats, n_seasons, rng, n_points=storm_synthesis.TRACK_POINTS):
+    """Simulate n_seasons and reduce them to mergeable summaries
+
+    Storm counts are Poisson(storms_per_year); each storm is major with
+    probability major_hurricanes / storms_per_year.
+    """
+    storms_per_year = stats["storms_per_year"]
+    p_major = min(1.0, stats["major_hurricanes"] / storms_per_year) if storms_per_year else 0.0
+
+    counts = rng.poisson(storms_per_year, size=n_seasons)
+    n_storms = int(counts.sum())
+    season = np.repeat(np.arange(n_seasons), counts)
+    major = rng.random(n_storms) < p_major
+
+    lat0 = rng.uniform(*storm_synthesis.GENESIS_LAT, size=n_storms)
+    lon0 = rng.uniform(*storm_synthesis.GENESIS_LON, size=n_storms)
+    wind = peak_winds(rng, stats["avg_wind"], major)
+
+    if n_storms:
+        ensemble = storm_synthesis.storm_tracks(lat0, lon0, wind, n_points)
+        # storms_per_year only scales expected_loss, which is not used here
+        event_loss = exposure_engine.assess_exposure(portfolio, ensemble, 1.0, index=index)["event_loss"]
+    else:
+        event_loss = np.zeros(0)
+
+    season_loss = np.bincount(season, event_loss, minlength=n_seasons)
+    season_max = np.zeros(n_seasons)
+    np.maximum.at(season_max, season, event_loss)
+
+    event_bin = loss_bins(event_loss)
+    n_bins = len(LOSS_EDGES)
+    tail = np.sort(season_loss)[::-1][:TAIL_SEASONS]
+    return {
+        "seasons": n_seasons,
+        "storms": n_storms,
+        "majors": int(major.sum()),
+        "loss_sum": float(season_loss.sum()),
+        "loss_sq_sum": float(np.square(season_loss).sum()),
+        "aep_hist": np.bincount(loss_bins(season_loss), minlength=n_bins),
+        "oep_hist": np.bincount(loss_bins(season_max), minlength=n_bins),
+        "event_hist": np.bincount(event_bin, minlength=n_bins),
+        "event_loss_sum": np.bincount(event_bin, event_loss, minlength=n_bins),
+        "tail": tail,
+    }
+
+def merge(total, part):
+    """Fold one chunk summary into the running total (order matters for floats)"""
+    if total is None:
+        return part
+    merged = {key: total[key] + part[key] for key in total if key != "tail"}
+    tail = np.concatenate([total["tail"], part["tail"]])
+    merged["tail"] = np.sort(tail)[::-1][:TAIL_SEASONS]
+    return merged
+
+# Per-process state set once by the pool initializer
+_WORKER = {}
+
+def _init_worker(portfolio, stats, seed, scenario, decade):
+    _WORKER.update(
+        portfolio=portfolio,
+        index=GridIndex(portfolio["lat"], portfolio["lon"]),
+        stats=stats,
+        seed=seed,
+        scenario=scenario,
+        decade=decade,
+    )
+
+def _run_chunk(job):
+    chunk, n_seasons = job
+    w = _WORKER
+    rng = chunk_rng(w["seed"], w["scenario"], w["decade"], chunk)
+    return simulate_chunk(w["portfolio"], w["index"], w["stats"], n_seasons, rng)
+
+def simulate_seasons(portfolio, stats, n_seasons=DEFAULT_SEASONS, seed=0, scenario="baseline",
+                     decade="2020s", workers=1, chunk_seasons=CHUNK_SEASONS):
+    """Simulate n_seasons and return the merged summary
+
+    Chunks run in a process pool when workers > 1 and are merged in chunk
+    order, so the result is identical for any worker count.
+    """
+    jobs = [(chunk, min(chunk_seasons, n_seasons - start))
+            for chunk, start in enumerate(range(0, n_seasons, chunk_seasons))]
+    init_args = (portfolio, stats, seed, scenario, decade)
+
+    total = None
+    if workers <= 1:
+        _init_worker(*init_args)
+        for job in jobs:
+            total = merge(total, _run_chunk(job))
+        return total
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=init_args) as pool:
+        for part in pool.map(_run_chunk, jobs):
+            total = merge(total, part)
+    return total
+
+def exceedance_curve(hist, n_seasons):
+    """[(loss, exceedance probability, return period)] at each bin edge above LOSS_MIN"""
+    exceeding = np.cumsum(hist[::-1])[::-1]
+    curve = []
+    for edge, count in zip(LOSS_EDGES[1:], exceeding[1:]):
+        if count == 0:
+            break
+        probability = count / n_seasons
+        curve.append([round(float(edge), 2), round(float(probability), 8), round(1.0 / probability, 2)])
+    return curve
+
+def pml(summary, return_period):
+    """Season loss exceeded once per return_period years
+
+    Exact from the retained tail when it reaches that rank, otherwise
+    read off the histogram at the lower bin edge.
+    """
+    n_seasons = summary["seasons"]
+    rank = n_seasons / return_period
+    if rank < 1:
+        return None
+    if rank <= len(summary["tail"]):
+        return float(summary["tail"][math.ceil(rank) - 1])
+    exceeding = np.cumsum(summary["aep_hist"][::-1])[::-1]
+    # Last bin whose lower edge is still exceeded at least `rank` times
+    bins = np.flatnonzero(exceeding >= rank)
+    return float(LOSS_EDGES[bins[-1]]) if len(bins) else 0.0
+
+def event_loss_table(summary):
+    """Binned event-loss table: events, annual rate and mean loss per loss band"""
+    n_seasons = summary["seasons"]
+    rows = []
+    for b in np.flatnonzero(summary["event_hist"]):
+        events = int(summary["event_hist"][b])
+        rows.append({
+            "min_loss": round(float(LOSS_EDGES[b]), 2),
+            "max_loss": round(float(LOSS_EDGES[b + 1]), 2) if b + 1 < len(LOSS_EDGES) else None,
+            "events": events,
+            "annual_rate": round(events / n_seasons, 8),
+            "mean_loss": round(float(summary["event_loss_sum"][b]) / events, 2),
+        })
+    return rows
+
+def _round(value):
+    return None if value is None else round(value, 2)
+
+def build_report(summary, scenario, decade, seed, chunk_seasons):
+    n = summary["seasons"]
+    aal = summary["loss_sum"] / n
+    variance = max(summary["loss_sq_sum"] / n - aal ** 2, 0.0)
+    return {
+        "format": REPORT_FORMAT,
+        "scenario": scenario,
+        "decade": decade,
+        "seasons": n,
+        "seed": seed,
+        "chunk_seasons": chunk_seasons,
+        "storms_per_season": round(summary["storms"] / n, 4),
+        "majors_per_season": round(summary["majors"] / n, 4),
+        "aal": round(aal, 2),
+        "aal_std_error": round(math.sqrt(variance / n), 2),
+        "season_loss_std": round(math.sqrt(variance), 2),
+        "pml": {str(rp): _round(pml(summary, rp)) for rp in RETURN_PERIODS},
+        "aep": exceedance_curve(summary["aep_hist"], n),
+        "oep": exceedance_curve(summary["oep_hist"], n),
+        "event_loss_table": event_loss_table(summary),
+    }
+
+def write_report(report, out_dir=SEASON_DIR):
+    path = Path(out_dir) / report["scenario"] / f"{report['decade']}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return atomic_files.write_text(path, json.dumps(report, separators=(",", ":")))
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate hurricane seasons and build loss curves")
+    parser.add_argument("--portfolio", help="CSV/JSON portfolio or store directory (default: climate-scenarios.html properties)")
+    parser.add_argument("--scenario", help="only this scenario (default: all)")
+    parser.add_argument("--decade", help="only this decade (default: all)")
+    parser.add_argument("--seasons", type=int, default=DEFAULT_SEASONS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="worker processes (results do not depend on this)")
+    parser.add_argument("--chunk", type=int, default=CHUNK_SEASONS, help="seasons per work unit")
+    parser.add_argument("--out", default=str(SEASON_DIR))
+    args = parser.parse_args()
+
+    portfolio = exposure_engine.load_portfolio(args.portfolio)
+    scenarios = scenario_data.load_inline_scenarios()
+
+    for scenario, entry in scenarios.items():
+        if args.scenario and scenario != args.scenario:
+            continue
+        for decade, stats in entry.items():
+            if decade == "name" or (args.decade and decade != args.decade):
+                continue
+            print(f"🎲 {scenario} {decade}: {args.seasons:,} seasons, "
+                  f"{len(portfolio['lat']):,} properties, {args.workers} worker(s)...")
+            summary = simulate_seasons(portfolio, stats, args.seasons, args.seed, scenario, decade,
+                                       args.workers, args.chunk)
+            report = build_report(summary, scenario, decade, args.seed, args.chunk)
+            path = write_report(report, args.out)
+            pml_100 = report["pml"]["100"]
+            print(f"   AAL ${report['aal']:,.0f} (±{report['aal_std_error']:,.0f}), "
+                  f"1-in-100 PML {'–' if pml_100 is None else f'${pml_100:,.0f}'} → {path}")
+
+if __name__ == "__main__":
+    main()
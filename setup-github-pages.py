@@ -7,35 +7,170 @@ Requires GitHub personal access token with 'repo' scope
 import requests
 import json
 import os
+import random
+import sys
+import time
 import base64
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from urllib.parse import quote
+from requests.adapters import HTTPAdapter
+
+from deploy_metrics import DeployMetrics
+
+DEFAULT_API_URL = "https://api.github.com"
+
+# (connect, read) seconds
+REQUEST_TIMEOUT = (10, 60)
+
+# Concurrent blob uploads; also the size of the connection pool. GitHub's
+# secondary rate limits penalise heavy parallelism, so keep this small.
+UPLOAD_WORKERS = 4
+
+# Retries for 5xx, 429, rate-limited 403 and connection errors
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0
+MAX_BACKOFF = 60.0
+# Don't sleep longer than this waiting for a rate-limit window to reset
+MAX_RATE_LIMIT_WAIT = 15 * 60
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Text files up to this size are sent inline in the tree request instead of
+# as separate blob uploads
+INLINE_TREE_BYTES = 512 * 1024
+
+def site_content(repo_path, source_path):
+    """File bytes as published, with root-relative links made Pages-compatible"""
+    source_path = Path(source_path)
+    if not repo_path.endswith('.html'):
+        return source_path.read_bytes()
+    
+    content = source_path.read_text(encoding='utf-8')
+    # Update relative paths for GitHub Pages
+    content = content.replace('href="/', 'href="./')
+    content = content.replace('src="/', 'src="./')
+    content = content.replace("href='/", "href='./")
+    content = content.replace("src='/", "src='./")
+    return content.encode('utf-8')
+
+def inline_text(content):
+    """Content as str if it can go inline in a tree request, else None"""
+    if len(content) > INLINE_TREE_BYTES:
+        return None
+    try:
+        return content.decode('utf-8')
+    except UnicodeDecodeError:
+        return None
+
+def git_blob_sha(content):
+    """SHA-1 git assigns to a blob with this content"""
+    return hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+
+def site_files(public_dir="public"):
+    """(repo path, source path) for every file under public_dir, sorted
+    
+    Precompressed .gz/.br siblings from `simple-deploy.py precompress` are
+    local-server artefacts and are left out.
+    """
+    public_dir = Path(public_dir)
+    return [
+        (path.relative_to(public_dir).as_posix(), path)
+        for path in sorted(public_dir.rglob("*"))
+        if path.is_file() and not (path.suffix in ('.gz', '.br') and path.with_suffix('').is_file())
+    ]
 
 class GitHubPagesSetup:
-    def __init__(self, token, owner="jiahknee5", repo="climate-risk-analysis"):
+    def __init__(self, token, owner="jiahknee5", repo="climate-risk-analysis",
+                 base_url=None, branch="main", max_workers=UPLOAD_WORKERS):
         self.token = token
         self.owner = owner
         self.repo = repo
-        self.base_url = "https://api.github.com"
+        self.branch = branch
+        # GITHUB_API_URL is also set by GitHub Actions and GitHub Enterprise;
+        # point it at a local mock to test deploys offline
+        self.base_url = (base_url or os.environ.get("GITHUB_API_URL", DEFAULT_API_URL)).rstrip("/")
         self.headers = {
             "Authorization": f"token {token}",
             "Accept": "application/vnd.github.v3+json",
             "User-Agent": "Climate-Risk-Deployer/1.0"
         }
+        
+        # One keep-alive session for every call: a deploy reuses a few warm
+        # connections instead of a TLS handshake per request. Retries are
+        # handled in make_request, where the rate-limit headers are visible.
+        self.max_workers = max_workers
+        # Set by remote_files when the repository has no commits
+        self.repo_empty = False
+        self.metrics = DeployMetrics("github-pages")
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+    
+    def retry_delay(self, response, attempt):
+        """Seconds to wait before retrying, or None if the response is final"""
+        rate_limited = response.status_code == 429 or (
+            response.status_code == 403 and (
+                "Retry-After" in response.headers
+                or response.headers.get("X-RateLimit-Remaining") == "0"
+            )
+        )
+        if rate_limited:
+            if "Retry-After" in response.headers:
+                try:
+                    delay = float(response.headers["Retry-After"])
+                except ValueError:
+                    delay = None
+            elif "X-RateLimit-Reset" in response.headers:
+                try:
+                    delay = float(response.headers["X-RateLimit-Reset"]) - time.time() + 1
+                except ValueError:
+                    delay = None
+            else:
+                delay = None
+            if delay is not None:
+                return max(delay, 0) if delay <= MAX_RATE_LIMIT_WAIT else None
+        elif response.status_code not in RETRY_STATUSES:
+            return None
+        return self.backoff(attempt)
+    
+    @staticmethod
+    def backoff(attempt):
+        """Exponential backoff with jitter"""
+        return min(MAX_BACKOFF, BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0)
+    
+    def send(self, method, url, data=None):
+        """One API call through the session, retried on transient failures"""
+        for attempt in range(MAX_RETRIES + 1):
+            if attempt:
+                self.metrics.add("retries")
+            self.metrics.add("api_calls")
+            try:
+                response = self.session.request(method, url, json=data, timeout=REQUEST_TIMEOUT)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt == MAX_RETRIES:
+                    raise
+                delay = self.backoff(attempt)
+                print(f"⏳ {type(e).__name__} on {method} {url}, retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            
+            self.metrics.add("bytes_sent", len(response.request.body or b""))
+            delay = self.retry_delay(response, attempt)
+            if delay is None or attempt == MAX_RETRIES:
+                return response
+            print(f"⏳ {response.status_code} on {method} {url}, retrying in {delay:.1f}s")
+            time.sleep(delay)
     
     def make_request(self, endpoint, method="GET", data=None):
         """Make authenticated GitHub API request"""
         url = f"{self.base_url}{endpoint}"
         
         try:
-            if method == "GET":
-                response = requests.get(url, headers=self.headers)
-            elif method == "POST":
-                response = requests.post(url, headers=self.headers, json=data)
-            elif method == "PUT":
-                response = requests.put(url, headers=self.headers, json=data)
-            elif method == "DELETE":
-                response = requests.delete(url, headers=self.headers)
-            
+            response = self.send(method, url, data)
             response.raise_for_status()
             return response.json() if response.content else {}
             
@@ -114,85 +249,167 @@ class GitHubPagesSetup:
             print(f"❌ Custom domain setup failed: {e}")
             raise e
     
-    def update_repository_files(self):
-        """Update repository files for GitHub Pages compatibility"""
-        print("📁 Updating repository files for GitHub Pages...")
+    def remote_sha(self, repo_path):
+        """Blob SHA of repo_path on the branch via the Contents API, or None"""
+        path = quote(repo_path)
+        response = self.send("GET", f"{self.base_url}/repos/{self.owner}/{self.repo}/contents/{path}?ref={self.branch}")
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        item = response.json()
+        return item.get("sha") if isinstance(item, dict) and item.get("type") == "file" else None
+    
+    def remote_files(self, public_dir="public"):
+        """Head commit, its tree and {path: blob sha} for the branch
         
-        # Files to update/create for GitHub Pages
-        files_to_update = [
-            {
-                "path": "index.html",
-                "source": "public/index.html",
-                "message": "Update index.html for GitHub Pages"
-            },
-            {
-                "path": "hurricane-risk-map.html", 
-                "source": "public/hurricane-risk-map.html",
-                "message": "Add hurricane risk map for GitHub Pages"
-            },
-            {
-                "path": "hurricane-season-2026.html",
-                "source": "public/hurricane-season-2026.html", 
-                "message": "Add hurricane season simulation for GitHub Pages"
-            },
-            {
-                "path": "climate-scenarios.html",
-                "source": "public/climate-scenarios.html",
-                "message": "Add climate scenarios comparison for GitHub Pages"
-            },
-            {
-                "path": "real-estate-risk.html",
-                "source": "public/real-estate-risk.html",
-                "message": "Add enhanced climate risk analysis for GitHub Pages"
-            },
-            {
-                "path": "climate-use-case-tests.md",
-                "source": "public/climate-use-case-tests.md",
-                "message": "Add use case tests documentation for GitHub Pages"
-            }
-        ]
+        One recursive tree fetch covers the whole repository, so the diff
+        against local files needs no per-file requests. A missing branch or
+        an empty repository has no files: head and tree are None.
+        """
+        repo_url = f"/repos/{self.owner}/{self.repo}"
+        # 404: no such branch; 409: the repository has no commits yet
+        response = self.send("GET", f"{self.base_url}{repo_url}/git/ref/heads/{self.branch}")
+        self.repo_empty = response.status_code == 409
+        if response.status_code in (404, 409):
+            print(f"ℹ️  {self.branch} does not exist yet, creating it")
+            return None, None, {}
+        response.raise_for_status()
+        head_sha = response.json()["object"]["sha"]
+        head_commit = self.make_request(f"{repo_url}/git/commits/{head_sha}")
+        tree_sha = head_commit["tree"]["sha"]
         
-        for file_info in files_to_update:
-            try:
-                # Read source file
-                source_path = Path(file_info["source"])
-                if not source_path.exists():
-                    print(f"⚠️  Source file not found: {source_path}")
+        tree = self.make_request(f"{repo_url}/git/trees/{tree_sha}?recursive=1")
+        if tree.get("truncated"):
+            # Too large to list in one response: look up each local path
+            print("⚠️  Remote tree listing truncated, looking up files one by one")
+            paths = [repo_path for repo_path, _ in site_files(public_dir)]
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                shas = pool.map(self.remote_sha, paths)
+                blobs = {path: sha for path, sha in zip(paths, shas) if sha}
+            return head_sha, tree_sha, blobs
+        blobs = {item["path"]: item["sha"] for item in tree["tree"] if item["type"] == "blob"}
+        return head_sha, tree_sha, blobs
+    
+    def changed_files(self, public_dir, remote):
+        """(repo path, content, remote sha or None) for files whose blob differs"""
+        changed = []
+        unchanged = 0
+        with self.metrics.stage("diff"):
+            for repo_path, source_path in site_files(public_dir):
+                content = site_content(repo_path, source_path)
+                self.metrics.update({"files_scanned": 1, "bytes_read": len(content)})
+                if remote.get(repo_path) == git_blob_sha(content):
+                    unchanged += 1
                     continue
-                
-                content = source_path.read_text(encoding='utf-8')
-                
-                # For HTML files, update paths to be GitHub Pages compatible
-                if file_info["path"].endswith('.html'):
-                    # Update relative paths for GitHub Pages
-                    content = content.replace('href="/', 'href="./')
-                    content = content.replace('src="/', 'src="./')
-                    content = content.replace("href='/", "href='./")
-                    content = content.replace("src='/", "src='./")
-                
+                changed.append((repo_path, content, remote.get(repo_path)))
+        self.metrics.update({"files_changed": len(changed), "files_unchanged": unchanged})
+        print(f"🔍 {len(changed)} changed, {unchanged} unchanged")
+        return changed
+    
+    def update_repository_files(self, public_dir="public"):
+        """Update repository files for GitHub Pages compatibility
+        
+        Only files whose content differs from the branch are uploaded, one
+        Contents API commit each.
+        """
+        print("📁 Updating repository files for GitHub Pages...")
+        
+        _, _, remote = self.remote_files(public_dir)
+        for repo_path, content, remote_sha in self.changed_files(public_dir, remote):
+            try:
                 # Prepare file data for GitHub API
                 file_data = {
-                    "message": file_info["message"],
-                    "content": base64.b64encode(content.encode()).decode()
+                    "message": f"{'Update' if remote_sha else 'Add'} {repo_path} for GitHub Pages",
+                    "content": base64.b64encode(content).decode()
                 }
-                
-                # Check if file already exists
-                try:
-                    existing_file = self.make_request(f"/repos/{self.owner}/{self.repo}/contents/{file_info['path']}")
-                    file_data["sha"] = existing_file["sha"]
-                    print(f"📝 Updating {file_info['path']}")
-                except:
-                    print(f"📝 Creating {file_info['path']}")
+                if remote_sha:
+                    file_data["sha"] = remote_sha
+                    print(f"📝 Updating {repo_path}")
+                else:
+                    print(f"📝 Creating {repo_path}")
                 
                 # Update/create file
-                result = self.make_request(f"/repos/{self.owner}/{self.repo}/contents/{file_info['path']}", "PUT", file_data)
-                print(f"✅ {file_info['path']} updated successfully")
+                result = self.make_request(f"/repos/{self.owner}/{self.repo}/contents/{repo_path}", "PUT", file_data)
+                print(f"✅ {repo_path} updated successfully")
                 
             except Exception as e:
-                print(f"❌ Failed to update {file_info['path']}: {e}")
+                print(f"❌ Failed to update {repo_path}: {e}")
                 continue
     
-    def deploy_to_github_pages(self, custom_domain="climate.johnnycchung.com"):
+    def batch_deploy(self, public_dir="public", message="Deploy public/ to GitHub Pages"):
+        """Publish changed files under public_dir as one commit via the Git Data API
+        
+        blobs -> tree (on top of the current tree) -> commit -> update ref.
+        Files whose git blob SHA already matches the branch are left out;
+        small text files travel inline in the tree request, so a typical
+        deploy is six requests however many pages there are.
+        """
+        print(f"📦 Batch deploying {public_dir}/ to {self.branch}...")
+        repo_url = f"/repos/{self.owner}/{self.repo}"
+        
+        head_sha, base_tree, remote = self.remote_files(public_dir)
+        if head_sha is None and self.repo_empty:
+            # The Git Data API rejects writes to a repository with no
+            # commits; the Contents API creates the first one
+            print("ℹ️  Repository is empty, creating it file by file")
+            self.update_repository_files(public_dir)
+            return None
+        changed = self.changed_files(public_dir, remote)
+        if not changed:
+            print(f"ℹ️  {self.branch} already up to date")
+            return head_sha
+        
+        entries = []
+        blobs = []
+        for repo_path, content, _ in changed:
+            entry = {"path": repo_path, "mode": "100644", "type": "blob"}
+            text = inline_text(content)
+            if text is not None:
+                entry["content"] = text
+            else:
+                blobs.append((entry, content))
+            entries.append(entry)
+        
+        def upload(content):
+            return self.make_request(f"{repo_url}/git/blobs", "POST", {
+                "content": base64.b64encode(content).decode(),
+                "encoding": "base64",
+            })["sha"]
+        
+        # Blob uploads are independent; run a few at a time over the pool
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for (entry, _), sha in zip(blobs, pool.map(upload, [content for _, content in blobs])):
+                entry["sha"] = sha
+        uploaded = len(blobs)
+        self.metrics.add("blob_uploads", uploaded)
+        
+        tree_data = {"tree": entries}
+        if base_tree:
+            tree_data["base_tree"] = base_tree
+        tree = self.make_request(f"{repo_url}/git/trees", "POST", tree_data)
+        if tree["sha"] == base_tree:
+            print(f"ℹ️  {self.branch} already up to date ({len(entries)} files)")
+            return head_sha
+        
+        commit = self.make_request(f"{repo_url}/git/commits", "POST", {
+            "message": message,
+            "tree": tree["sha"],
+            "parents": [head_sha] if head_sha else [],
+        })
+        if head_sha:
+            self.make_request(f"{repo_url}/git/refs/heads/{self.branch}", "PATCH", {
+                "sha": commit["sha"],
+                "force": False,
+            })
+        else:
+            self.make_request(f"{repo_url}/git/refs", "POST", {
+                "ref": f"refs/heads/{self.branch}",
+                "sha": commit["sha"],
+            })
+        print(f"✅ Committed {len(entries)} files ({uploaded} blob uploads) as {commit['sha'][:7]}")
+        return commit["sha"]
+    
+    def deploy_to_github_pages(self, custom_domain="climate.johnnycchung.com", batch=False):
         """Complete GitHub Pages deployment process"""
         print("🚀 Starting GitHub Pages deployment...")
         print(f"📍 Repository: {self.owner}/{self.repo}")
@@ -201,15 +418,21 @@ class GitHubPagesSetup:
         
         try:
             # Step 1: Update repository files
-            self.update_repository_files()
+            with self.metrics.stage("upload"):
+                if batch:
+                    self.batch_deploy()
+                else:
+                    self.update_repository_files()
             print()
             
             # Step 2: Enable GitHub Pages
-            pages_info = self.enable_github_pages()
+            with self.metrics.stage("enable_pages"):
+                pages_info = self.enable_github_pages()
             print()
             
             # Step 3: Set up custom domain
-            self.setup_custom_domain(custom_domain)
+            with self.metrics.stage("custom_domain"):
+                self.setup_custom_domain(custom_domain)
             print()
             
             # Display results
@@ -242,6 +465,8 @@ class GitHubPagesSetup:
         except Exception as e:
             print(f"❌ GitHub Pages deployment failed: {e}")
             raise e
+        finally:
+            self.metrics.finish()
 
 def main():
     """Main deployment function"""
@@ -262,9 +487,9 @@ def main():
     # Initialize deployer
     deployer = GitHubPagesSetup(token)
     
-    # Deploy to GitHub Pages
+    # Deploy to GitHub Pages (--batch: one commit via the Git Data API)
     try:
-        result = deployer.deploy_to_github_pages()
+        result = deployer.deploy_to_github_pages(batch="--batch" in sys.argv[1:])
         print("✅ Deployment successful!")
         return True
     except Exception as e:
@@ -4,42 +4,815 @@ Simple HTTP deployment server for climate risk analysis
 Can be used as a fallback when other deployment methods fail
 """
 
+import argparse
+import gzip
+import hashlib
 import http.server
+import json
+import multiprocessing
 import socketserver
 import os
+import re
 import webbrowser
 import threading
 import time
+import urllib.parse
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from email.utils import formatdate, parsedate_to_datetime
 from pathlib import Path
 
+# Text assets that get precompressed .br/.gz siblings
+COMPRESSIBLE_EXTENSIONS = {
+    '.html', '.css', '.js', '.mjs', '.json', '.geojson', '.md', '.svg', '.txt', '.xml', '.csv',
+}
+# Below this size compression saves less than the extra header costs
+MIN_COMPRESS_BYTES = 1024
+
+# Preferred first when the client accepts several
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+# Filenames carrying a content hash (app.3f9a2c1d7e.js) never change in place
+# A fingerprint is 10+ hex characters mixing letters and digits, so dates,
+# timestamps and version numbers (report.20261016.json) stay revalidated
+HASHED_ASSET = re.compile(r"\.(?=[0-9a-f]*[a-f])(?=[0-9a-f]*[0-9])[0-9a-f]{10,}\.\w+$")
+
+class CachedFile:
+    """Validators and (for small files) the body of one file version"""
+    
+    def __init__(self, key, etag, last_modified, mtime, body):
+        self.key = key
+        self.etag = etag
+        self.last_modified = last_modified
+        self.mtime = mtime
+        self.body = body
+    
+    @property
+    def size(self):
+        return self.key[2]
+
+class FileCache:
+    """LRU cache of file bodies keyed by path and mtime, bounded in bytes
+    
+    Every entry carries a strong ETag (SHA-256 of the content). Files larger
+    than max_file_bytes keep only their validators and are read from disk.
+    """
+    
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_file_bytes=4 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+    
+    def get(self, path, stat=None, f=None):
+        """Current CachedFile for path; raises OSError if it can't be read
+        
+        Pass a known os.stat result to skip the stat call. It only decides
+        whether the cached entry is still current: a loaded entry takes its
+        size and mtime from the file it actually read, so a stale stat can
+        never pair new bytes with an old Content-Length. With f, an open
+        binary file for path, a reload reads that file instead of reopening
+        the path.
+        """
+        if stat is None:
+            stat = os.stat(path)
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry.key == key:
+                self._entries.move_to_end(path)
+                return entry
+        
+        entry = self._load(path, f)
+        
+        with self._lock:
+            old = self._entries.pop(path, None)
+            if old is not None and old.body is not None:
+                self._size -= len(old.body)
+            self._entries[path] = entry
+            if entry.body is not None:
+                self._size += len(entry.body)
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                if evicted.body is not None:
+                    self._size -= len(evicted.body)
+        return entry
+    
+    def _load(self, path, f=None):
+        if f is None:
+            with open(path, "rb") as f:
+                return self._load(path, f)
+        
+        digest = hashlib.sha256()
+        body = None
+        f.seek(0)
+        stat = os.fstat(f.fileno())
+        if stat.st_size <= self.max_file_bytes:
+            body = f.read()
+            digest.update(body)
+            size = len(body)
+        else:
+            size = 0
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+                size += len(block)
+        key = (path, stat.st_mtime_ns, size)
+        etag = f'"{digest.hexdigest()[:32]}"'
+        return CachedFile(key, etag, formatdate(stat.st_mtime, usegmt=True), stat.st_mtime, body)
+
+FILE_CACHE = FileCache()
+
+# Mirrors the /climate/ rules in the .htaccess written by deploy-to-main-domain.py
+CLIMATE_PREFIX = '/climate'
+
+class RouteTable:
+    """URL path -> file map of the served tree, kept current by a polling watcher
+    
+    Requests resolve with dict lookups instead of probing the filesystem.
+    The watcher rescans every poll_interval seconds, so added, removed and
+    edited files are picked up within that delay.
+    
+    Each rescan walks and stats the whole tree (in-place edits don't change
+    a directory's mtime, so no directory can be skipped): the watcher's cost
+    grows with the number of files served, not with traffic. Use a longer
+    poll_interval for very large trees.
+    """
+    
+    def __init__(self, root="public", poll_interval=1.0):
+        self.root = root
+        self.poll_interval = poll_interval
+        # (url path -> file path, file path -> os.stat result, directory url paths),
+        # swapped as a whole so readers never see a half-built table
+        self._snapshot = None
+        self._watcher = None
+        self._lock = threading.Lock()
+    
+    def scan(self):
+        files, stats, dirs = {}, {}, {'/'}
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            rel = os.path.relpath(dirpath, self.root).replace(os.sep, '/')
+            prefix = '/' if rel == '.' else f'/{rel}/'
+            for name in dirnames:
+                dirs.add(prefix + name)
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    stats[path] = os.stat(path)
+                except OSError:
+                    continue
+                files[prefix + name] = path
+        return files, stats, dirs
+    
+    def refresh(self):
+        """Rescan the tree; returns True when the set of routes changed"""
+        snapshot = self.scan()
+        previous, self._snapshot = self._snapshot, snapshot
+        return previous is not None and previous[0].keys() != snapshot[0].keys()
+    
+    def start(self):
+        """Build the table and start the watcher thread (idempotent)"""
+        with self._lock:
+            if self._watcher is not None:
+                return
+            self.refresh()
+            self._watcher = threading.Thread(target=self._watch, name="route-watcher", daemon=True)
+            self._watcher.start()
+    
+    def _watch(self):
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                if self.refresh():
+                    print(f"🔄 Routes updated ({len(self._snapshot[0])} files)")
+            except OSError as e:
+                print(f"⚠️  Route scan failed: {e}")
+    
+    def stat(self, path):
+        """Last seen os.stat result for a file path, or None if it isn't served"""
+        if self._snapshot is None:
+            self.refresh()
+        return self._snapshot[1].get(path)
+    
+    def resolve(self, request_path):
+        """Map a request path to (url_path, file_path)
+        
+        file_path is None for directories (left to the base handler) and the
+        whole result is None when nothing should be served. Query strings
+        and fragments are ignored; unknown paths fall back to index.html
+        for single page app routing, except under /static.
+        """
+        if self._snapshot is None:
+            self.refresh()
+        files, _, dirs = self._snapshot
+        
+        path = urllib.parse.unquote(urllib.parse.urlsplit(request_path).path) or '/'
+        if path in (CLIMATE_PREFIX, CLIMATE_PREFIX + '/'):
+            path = '/'
+        elif path.startswith(CLIMATE_PREFIX + '/'):
+            path = path[len(CLIMATE_PREFIX):]
+        if path == '/':
+            path = '/index.html'
+        
+        if path in files:
+            return path, files[path]
+        if path.rstrip('/') in dirs:
+            return path, None
+        if path.startswith('/static') or '/index.html' not in files:
+            return None
+        return '/index.html', files['/index.html']
+
+# DEPLOY_ROUTE_POLL sets the rescan interval in seconds (default 1)
+ROUTES = RouteTable(poll_interval=float(os.environ.get("DEPLOY_ROUTE_POLL", "1.0")))
+
+def is_compressible(path):
+    return Path(path).suffix.lower() in COMPRESSIBLE_EXTENSIONS
+
+def precompress_assets(public_dir="public"):
+    """Write .gz (and .br when the brotli module is installed) siblings for text assets
+    
+    Siblings newer than their source are left alone, so re-running is cheap.
+    Output is deterministic (no embedded mtime) so unchanged inputs produce
+    byte-identical archives.
+    """
+    import atomic_files
+    
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+        print("ℹ️  brotli not installed, writing .gz only (pip install brotli)")
+    
+    written = 0
+    for path in sorted(Path(public_dir).rglob("*")):
+        if not path.is_file() or not is_compressible(path):
+            continue
+        stat = path.stat()
+        if stat.st_size < MIN_COMPRESS_BYTES:
+            continue
+        
+        data = None
+        for encoding, suffix in ENCODINGS:
+            if encoding == 'br' and brotli is None:
+                continue
+            target = path.with_name(path.name + suffix)
+            if target.exists() and target.stat().st_mtime_ns >= stat.st_mtime_ns:
+                continue
+            
+            if data is None:
+                data = path.read_bytes()
+            if encoding == 'br':
+                compressed = brotli.compress(data, quality=11)
+            else:
+                compressed = gzip.compress(data, compresslevel=9, mtime=0)
+            
+            atomic_files.write_bytes(target, compressed)
+            written += 1
+            print(f"🗜️  {target} ({len(data):,} → {len(compressed):,} bytes)")
+    
+    print(f"✅ Precompressed {written} file(s)")
+    return written
+
+def accepted_encodings(header):
+    """Content codings the client accepts (q > 0) from an Accept-Encoding header"""
+    accepted = set()
+    for part in (header or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if coding and q > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+def parse_byte_range(header, size):
+    """Inclusive (start, end) for a single-range `Range: bytes=...` header
+    
+    Returns None when the header is absent, malformed or asks for several
+    ranges (the whole file is served instead) and raises ValueError when
+    the range lies entirely outside a file of this size.
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in spec:
+        return None
+    first, sep, last = spec.strip().partition('-')
+    if not sep or not (first.isdigit() or last.isdigit()):
+        return None
+    if first and last and not (first.isdigit() and last.isdigit()):
+        return None
+    
+    if not first:
+        # Suffix range: the final N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError("empty suffix range")
+        return max(size - length, 0), size - 1
+    
+    start = int(first)
+    end = int(last) if last else size - 1
+    if last and end < start:
+        return None
+    if start >= size:
+        raise ValueError("range starts past the end of the file")
+    return start, min(end, size - 1)
+
+# Portfolio scoring API: POST a CSV/JSON portfolio to /api/score
+SCORE_PATH = '/api/score'
+# One scoring process per core, so jobs run outside the request threads' GIL
+SCORE_WORKERS = os.cpu_count() or 1
+# Jobs queued or running at once; further submissions get 503
+SCORE_MAX_PENDING = 2 * SCORE_WORKERS
+MAX_SCORE_BODY = 64 * 1024 * 1024
+MAX_SCORE_STORMS = 10000
+# Results with more rows than this always stream as NDJSON
+STREAM_ROWS = 5000
+STREAM_CHUNK = 64 * 1024
+
+class ScorerBusy(Exception):
+    """Every scoring slot is taken"""
+
+class ScenarioCache:
+    """scenario_data.load_scenarios(), parsed once and re-read when its files change
+    
+    The version is ROUTES' stat of the scenario page and of every storm
+    slice, so checking it costs a few dict lookups instead of a page parse
+    and picks up edits within one route rescan.
+    """
+    
+    def __init__(self):
+        self._scenarios = None
+        self._version = None
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _stamp(scenarios):
+        import scenario_data
+        
+        paths = [scenario_data.SCENARIOS_PAGE] + [
+            scenario_data.slice_path(scenario, decade)
+            for scenario, entry in scenarios.items() for decade in entry if decade != "name"
+        ]
+        stamp = []
+        for path in paths:
+            stat = ROUTES.stat(str(path))
+            stamp.append(None if stat is None else (stat.st_mtime_ns, stat.st_size))
+        return tuple(stamp)
+    
+    def get(self):
+        """(scenarios, version); version changes whenever the data is re-read"""
+        import scenario_data
+        
+        with self._lock:
+            if self._scenarios is None or self._stamp(self._scenarios) != self._version:
+                self._scenarios = scenario_data.load_scenarios()
+                self._version = self._stamp(self._scenarios)
+            return self._scenarios, self._version
+
+SCENARIOS = ScenarioCache()
+
+class PortfolioScorer:
+    """Process pool with a bounded queue and an LRU cache of scoring jobs
+    
+    exposure_engine.score_portfolio runs in worker processes, so scoring
+    never holds the GIL the request threads need. The pool starts on the
+    first job and is replaced if a worker dies.
+    
+    Jobs are keyed by the SHA-256 of the posted portfolio plus the scoring
+    parameters and the scenario data version. The cache holds futures, so a
+    repeat that arrives while the first request is still running waits on
+    the same job. Failed jobs are dropped; finished ones are evicted least
+    recently used first once their encoded results exceed max_bytes.
+    """
+    
+    def __init__(self, workers=SCORE_WORKERS, max_pending=SCORE_MAX_PENDING,
+                 max_entries=64, max_bytes=256 * 1024 * 1024):
+        self.workers = workers
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def submit(self, body, content_type, scenario, decade, storms, seed):
+        """(future, cached) for a scoring request
+        
+        Raises ScorerBusy when the queue is full and ValueError for an
+        unknown scenario/decade.
+        """
+        fmt = "csv" if "csv" in content_type else "json"
+        scenarios, version = SCENARIOS.get()
+        stats = scenarios.get(scenario, {}).get(decade)
+        if not isinstance(stats, dict):
+            raise ValueError(f"unknown scenario/decade {scenario}/{decade}")
+        key = (hashlib.sha256(body).hexdigest(), fmt, scenario, decade, storms,
+               seed if storms else None, version)
+        
+        with self._lock:
+            future = self._entries.get(key)
+            if future is not None:
+                self._entries.move_to_end(key)
+                return future, True
+            if not self._slots.acquire(blocking=False):
+                raise ScorerBusy()
+            try:
+                import exposure_engine
+                
+                if self._executor is None:
+                    # spawn, not fork: forking copies locks other request
+                    # threads may be holding
+                    self._executor = ProcessPoolExecutor(
+                        self.workers, mp_context=multiprocessing.get_context("spawn"))
+                executor = self._executor
+                future = executor.submit(exposure_engine.score_portfolio,
+                                         body, fmt, stats, scenario, decade, storms, seed)
+            except BaseException:
+                self._slots.release()
+                raise
+            self._entries[key] = future
+        future.add_done_callback(lambda done: self._finished(key, done, executor))
+        return future, False
+    
+    def _finished(self, key, future, executor):
+        self._slots.release()
+        with self._lock:
+            if future.cancelled() or future.exception() is not None:
+                if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+                    # A worker died; the next job starts a fresh pool
+                    if self._executor is executor:
+                        self._executor = None
+                if self._entries.get(key) is future:
+                    del self._entries[key]
+                return
+            self._evict()
+    
+    def _evict(self):
+        done = [(key, f) for key, f in self._entries.items()
+                if f.done() and not f.cancelled() and f.exception() is None]
+        size = sum(f.result().size for _, f in done)
+        for key, future in done:
+            if size <= self.max_bytes and len(self._entries) <= self.max_entries:
+                break
+            if len(self._entries) == 1:
+                break
+            del self._entries[key]
+            size -= future.result().size
+
+SCORER = PortfolioScorer()
+
 class ClimateRiskHandler(http.server.SimpleHTTPRequestHandler):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, directory="public", **kwargs)
     
+    def handle_one_request(self):
+        # With keep-alive one handler serves every request on a connection,
+        # so per-response headers start from the default each time
+        self.cache_control = 'no-cache'
+        super().handle_one_request()
+    
     def end_headers(self):
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Cache-Control', self.cache_control)
         super().end_headers()
     
     def do_GET(self):
-        # Handle routing for single page applications
-        if self.path == '/' or self.path == '/index.html':
-            self.path = '/index.html'
-        elif not os.path.exists(f"public{self.path}") and not self.path.startswith('/static'):
-            self.path = '/index.html'
+        return self.serve_route()
+    
+    def do_HEAD(self):
+        return self.serve_route(head=True)
+    
+    def do_OPTIONS(self):
+        # CORS preflight for POST /api/score
+        self.send_response(204)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+    
+    def do_POST(self):
+        if urllib.parse.urlsplit(self.path).path.rstrip('/') != SCORE_PATH:
+            # Any request body is left unread, so the connection can't be reused
+            self.send_json(404, {"error": "not found"}, {'Connection': 'close'})
+            return
+        return self.score()
+    
+    def score(self):
+        """POST /api/score?scenario=&decade=&storms=&seed= with a CSV/JSON portfolio body"""
+        try:
+            length = int(self.headers.get('Content-Length', ''))
+        except ValueError:
+            length = -1
+        if not 0 <= length <= MAX_SCORE_BODY:
+            # The body is left unread, so the connection can't be reused
+            if length < 0:
+                self.send_json(411, {"error": "Content-Length required"}, {'Connection': 'close'})
+            else:
+                self.send_json(413, {"error": f"portfolio larger than {MAX_SCORE_BODY} bytes"},
+                               {'Connection': 'close'})
+            return
+        body = self.rfile.read(length)
+        
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+        def param(name, default):
+            return query.get(name, [default])[-1]
+        try:
+            storms = int(param('storms', '0'))
+            seed = int(param('seed', '0'))
+        except ValueError:
+            self.send_json(400, {"error": "storms and seed must be integers"})
+            return
+        if not 0 <= storms <= MAX_SCORE_STORMS:
+            self.send_json(400, {"error": f"storms must be between 0 and {MAX_SCORE_STORMS}"})
+            return
+        
+        try:
+            future, cached = SCORER.submit(body, self.headers.get('Content-Type', ''),
+                                           param('scenario', 'baseline'), param('decade', '2020s'),
+                                           storms, seed)
+        except ScorerBusy:
+            self.send_json(503, {"error": "scoring queue is full"}, {'Retry-After': '1'})
+            return
+        except ValueError as e:
+            self.send_json(400, {"error": str(e)})
+            return
+        except Exception as e:
+            self.send_json(500, {"error": f"scoring failed: {e}"})
+            return
+        try:
+            result = future.result()
+        except (ValueError, UnicodeDecodeError) as e:
+            self.send_json(400, {"error": str(e)})
+            return
+        except Exception as e:
+            self.send_json(500, {"error": f"scoring failed: {e}"})
+            return
+        
+        headers = {'X-Score-Cache': 'hit' if cached else 'miss'}
+        if result.count > STREAM_ROWS or 'application/x-ndjson' in self.headers.get('Accept', ''):
+            self.send_ndjson(result, headers)
+        else:
+            self.send_json(200, result.json_body(), headers)
+    
+    def send_json(self, status, payload, headers=None):
+        body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def send_ndjson(self, result, headers):
+        """Summary line then one line per property, chunked on HTTP/1.1"""
+        chunked = self.request_version == 'HTTP/1.1' and self.protocol_version == 'HTTP/1.1'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+        else:
+            # HTTP/1.0: the end of the body is the end of the connection
+            self.close_connection = True
+        self.end_headers()
+        
+        first = json.dumps(result.header).encode() + b"\n"
+        rows = memoryview(result.rows)
+        for block in [first] + [rows[i:i + STREAM_CHUNK] for i in range(0, len(rows), STREAM_CHUNK)]:
+            if chunked:
+                self.wfile.write(f"{len(block):x}\r\n".encode() + bytes(block) + b"\r\n")
+            else:
+                self.wfile.write(block)
+        if chunked:
+            self.wfile.write(b"0\r\n\r\n")
+    
+    def serve_route(self, head=False):
+        """Resolve the request through ROUTES (SPA fallback, /climate/ prefix)"""
+        route = ROUTES.resolve(self.path)
+        if route is None:
+            self.send_error(404, "File not found")
+            return
+        
+        url_path, path = route
+        if path is None:
+            parts = urllib.parse.urlsplit(self.path)
+            if not parts.path.endswith('/'):
+                # Redirect from the path as requested, keeping any /climate prefix
+                self.send_response(301)
+                self.send_header('Location', urllib.parse.urlunsplit(parts._replace(path=parts.path + '/')))
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            # Directory listings stay with the base class
+            self.path = url_path
+            return super().do_HEAD() if head else super().do_GET()
+        return self.serve_file(path, head)
+    
+    def serve_file(self, path, head=False):
+        """Serve a file from FILE_CACHE, answering conditional requests with 304"""
+        content_type = self.guess_type(path)
+        compressible = is_compressible(path)
+        # Byte ranges always address the identity representation, so a
+        # client can slice a packed data file regardless of Accept-Encoding
+        range_header = self.headers.get('Range')
+        if compressible and range_header is None:
+            encoding, body_path = self.negotiate_encoding(path)
+        else:
+            encoding, body_path = None, path
+        
+        try:
+            entry = FILE_CACHE.get(body_path, ROUTES.stat(body_path))
+            f = None
+            if entry.body is None:
+                f, entry = self.open_current(body_path, entry)
+        except OSError:
+            self.send_error(404, "File not found")
+            return
+        try:
+            self.send_entry(path, entry, f, content_type, encoding, compressible, range_header, head)
+        finally:
+            if f is not None:
+                f.close()
+    
+    def open_current(self, path, entry):
+        """Open a disk-backed file and the CachedFile describing that open file
+        
+        ROUTES' stat can be up to one rescan old. If the file was replaced
+        since, the entry is reloaded from the open descriptor, so headers and
+        the bytes sendfile reads describe the same version.
+        """
+        f = open(path, 'rb')
+        try:
+            stat = os.fstat(f.fileno())
+            if entry.key != (path, stat.st_mtime_ns, stat.st_size):
+                entry = FILE_CACHE.get(path, stat, f)
+        except BaseException:
+            f.close()
+            raise
+        return f, entry
+    
+    def send_entry(self, path, entry, f, content_type, encoding, compressible, range_header, head):
+        """Headers and body for a cached file; f is open when entry has no body"""
+        # Hashed assets can be cached for a year; everything else revalidates
+        if HASHED_ASSET.search(path):
+            self.cache_control = 'public, max-age=31536000, immutable'
+        
+        if self.not_modified(entry):
+            self.send_response(304)
+            self.send_header('ETag', entry.etag)
+            self.send_header('Last-Modified', entry.last_modified)
+            if compressible:
+                self.send_header('Vary', 'Accept-Encoding')
+            self.end_headers()
+            return
+        
+        byte_range = None
+        if range_header is not None and self.range_applies(entry):
+            try:
+                byte_range = parse_byte_range(range_header, entry.size)
+            except ValueError:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{entry.size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
         
-        return super().do_GET()
+        start, end = byte_range or (0, entry.size - 1)
+        if byte_range is None:
+            self.send_response(200)
+        else:
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{entry.size}')
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(end - start + 1))
+        self.send_header('Accept-Ranges', 'bytes')
+        if encoding is not None:
+            self.send_header('Content-Encoding', encoding)
+        if compressible:
+            self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('ETag', entry.etag)
+        self.send_header('Last-Modified', entry.last_modified)
+        self.end_headers()
+        
+        if head or end < start:
+            return
+        if entry.body is not None:
+            self.wfile.write(memoryview(entry.body)[start:end + 1])
+        else:
+            self.send_file_range(f, start, end - start + 1)
+    
+    def send_file_range(self, f, offset, count):
+        """Stream part of an open file straight from the page cache to the socket
+        
+        socket.sendfile uses os.sendfile where available (no copies through
+        Python buffers) and falls back to plain send() elsewhere. At most
+        `count` bytes are sent; if the file was truncated in place and fewer
+        were available, the connection is closed so the client doesn't read
+        the next response as part of this body.
+        """
+        # Headers must reach the socket before the file bytes
+        self.wfile.flush()
+        if self.connection.sendfile(f, offset, count) < count:
+            self.close_connection = True
+    
+    def range_applies(self, entry):
+        """If-Range: honour Range only while the client's copy is current"""
+        if_range = self.headers.get('If-Range')
+        if if_range is None:
+            return True
+        if_range = if_range.strip()
+        if if_range.startswith(('"', 'W/')):
+            return if_range == entry.etag
+        try:
+            return parsedate_to_datetime(if_range).timestamp() >= int(entry.mtime)
+        except (TypeError, ValueError, IndexError, OverflowError):
+            return False
+    
+    def negotiate_encoding(self, path):
+        """Pick a fresh precompressed sibling the client accepts
+        
+        Returns (content_coding, path_to_send); (None, path) when the
+        original file should be sent as-is.
+        """
+        accepted = accepted_encodings(self.headers.get('Accept-Encoding'))
+        source = ROUTES.stat(path)
+        if not accepted or source is None:
+            return None, path
+        for encoding, suffix in ENCODINGS:
+            if encoding not in accepted:
+                continue
+            sibling = ROUTES.stat(path + suffix)
+            if sibling is not None and sibling.st_mtime_ns >= source.st_mtime_ns:
+                return encoding, path + suffix
+        return None, path
+    
+    def not_modified(self, entry):
+        """Evaluate If-None-Match, falling back to If-Modified-Since"""
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(',')]
+            return '*' in tags or entry.etag in tags
+        
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since is not None:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError, IndexError, OverflowError):
+                return False
+            return int(entry.mtime) <= since
+        return False
+
+class KeepAliveClimateRiskHandler(ClimateRiskHandler):
+    """HTTP/1.1 handler: connections stay open between requests"""
+    protocol_version = "HTTP/1.1"
+    
+    # Idle keep-alive connections are dropped after this many seconds so
+    # they don't pin worker threads forever
+    timeout = 30
+    
+    # Small responses (304s, cached API results) go out without waiting on
+    # the client's delayed ACK
+    disable_nagle_algorithm = True
+
+class ClimateRiskServer(http.server.ThreadingHTTPServer):
+    """Thread-per-connection server for use as a fallback origin"""
+    daemon_threads = True
+    allow_reuse_address = True
+    # Listen backlog sized for bursts of hundreds of connections
+    request_queue_size = 512
 
-def deploy_local(port=8080):
+SERVER_MODES = ("threaded", "single")
+
+def create_server(port, mode="threaded"):
+    """Build the local server for the given mode
+    
+    threaded: one thread per connection with HTTP/1.1 keep-alive
+    single:   the original one-request-at-a-time TCPServer
+    """
+    ROUTES.start()
+    if mode == "threaded":
+        return ClimateRiskServer(("", port), KeepAliveClimateRiskHandler)
+    if mode == "single":
+        return socketserver.TCPServer(("", port), ClimateRiskHandler)
+    raise ValueError(f"Unknown server mode {mode!r} (expected one of {', '.join(SERVER_MODES)})")
+
+def deploy_local(port=8080, mode="threaded"):
     """Deploy locally for testing"""
-    print(f"🚀 Starting local deployment on port {port}...")
+    print(f"🚀 Starting local deployment on port {port} ({mode} server)...")
     
     # Change to deployment directory
     os.chdir(Path(__file__).parent)
     
-    with socketserver.TCPServer(("", port), ClimateRiskHandler) as httpd:
+    with create_server(port, mode) as httpd:
         print(f"📱 Server running at: http://localhost:{port}")
         print(f"🌍 Access climate apps at:")
         print(f"   • Main: http://localhost:{port}")
@@ -62,27 +835,56 @@ def deploy_local(port=8080):
         except KeyboardInterrupt:
             print("\n🛑 Server stopped")
 
+def stage_public(target, public_dir="public"):
+    """Hard-link public/ into .build-cache/stage/<target> without .gz/.br siblings
+    
+    The precompressed siblings only serve the local server; CDNs compress
+    on their own. artifact_builder and the GitHub Pages deploy leave them
+    out the same way. Returns the staging directory.
+    """
+    import shutil
+    from artifact_builder import collect_entries
+    
+    stage = Path('.build-cache') / 'stage' / target
+    shutil.rmtree(stage, ignore_errors=True)
+    for name, path in collect_entries(public_dir):
+        dest = stage / name
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(path, dest)
+        except OSError:
+            shutil.copy2(path, dest)
+    return stage
+
 def deploy_to_surge():
     """Deploy to Surge.sh (free static hosting)"""
     import subprocess
     import json
+    from deploy_metrics import DeployMetrics
     
     print("🚀 Deploying to Surge.sh...")
+    metrics = DeployMetrics("surge")
     
-    try:
-        # Check if surge is installed
-        subprocess.run(["surge", "--version"], capture_output=True, check=True)
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        print("📦 Installing Surge.sh...")
-        subprocess.run(["npm", "install", "-g", "surge"], check=True)
+    with metrics.stage("install"):
+        try:
+            # Check if surge is installed
+            subprocess.run(["surge", "--version"], capture_output=True, check=True)
+        except (subprocess.CalledProcessError, FileNotFoundError):
+            print("📦 Installing Surge.sh...")
+            subprocess.run(["npm", "install", "-g", "surge"], check=True)
+    
+    with metrics.stage("scan"):
+        stage = stage_public("surge")
+        metrics.count_tree(stage)
     
     # Deploy to surge
     domain = "climate-risk-analysis.surge.sh"
     
     try:
-        result = subprocess.run([
-            "surge", "public", domain
-        ], capture_output=True, text=True, input="\n\n")  # Auto-confirm prompts
+        with metrics.stage("upload"):
+            result = subprocess.run([
+                "surge", str(stage), domain
+            ], capture_output=True, text=True, input="\n\n")  # Auto-confirm prompts
         
         if result.returncode == 0:
             print(f"✅ Deployed to Surge.sh: https://{domain}")
@@ -93,18 +895,26 @@ def deploy_to_surge():
     except Exception as e:
         print(f"❌ Surge deployment error: {e}")
         return None
+    finally:
+        metrics.finish()
 
 def deploy_to_firebase():
     """Deploy to Firebase Hosting"""
     import subprocess
     import json
+    from deploy_metrics import DeployMetrics
     
     print("🚀 Deploying to Firebase Hosting...")
+    metrics = DeployMetrics("firebase")
+    
+    with metrics.stage("scan"):
+        stage = stage_public("firebase")
+        metrics.count_tree(stage)
     
     # Create firebase.json config
     firebase_config = {
         "hosting": {
-            "public": "public",
+            "public": stage.as_posix(),
             "ignore": ["firebase.json", "**/.*", "**/node_modules/**"],
             "rewrites": [
                 {
@@ -132,10 +942,12 @@ def deploy_to_firebase():
     try:
         # Initialize if needed
         if not os.path.exists(".firebaserc"):
-            subprocess.run(["firebase", "init", "hosting"], check=True)
+            with metrics.stage("init"):
+                subprocess.run(["firebase", "init", "hosting"], check=True)
         
         # Deploy
-        result = subprocess.run(["firebase", "deploy"], capture_output=True, text=True)
+        with metrics.stage("upload"):
+            result = subprocess.run(["firebase", "deploy"], capture_output=True, text=True)
         
         if result.returncode == 0:
             # Extract URL from output
@@ -151,25 +963,21 @@ def deploy_to_firebase():
     except Exception as e:
         print(f"❌ Firebase deployment error: {e}")
         return None
+    finally:
+        metrics.finish()
 
 def deploy_to_render():
     """Deploy to Render using their API"""
     import requests
-    import zipfile
-    import io
+    from artifact_builder import build_archive
     
     print("🚀 Deploying to Render...")
     
-    # Create zip of public directory
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-        for root, dirs, files in os.walk('public'):
-            for file in files:
-                file_path = os.path.join(root, file)
-                arcname = os.path.relpath(file_path, 'public')
-                zip_file.write(file_path, arcname)
-    
-    zip_buffer.seek(0)
+    # Stream a reproducible zip of the public directory to disk; an uploader
+    # can instead pass sink= to receive it in chunks
+    artifact = build_archive('public', Path('.build-cache') / 'render-public.zip')
+    print(f"📦 {artifact['path']}: {artifact['files']} files, {artifact['bytes_out']:,} bytes "
+          f"(sha256 {artifact['sha256'][:12]})")
     
     # Note: This would require Render API token and proper setup
     print("⚠️  Render deployment requires API token setup")
@@ -177,32 +985,42 @@ def deploy_to_render():
     
     return None
 
-if __name__ == "__main__":
-    import sys
-    
-    if len(sys.argv) > 1:
-        method = sys.argv[1].lower()
-        
-        if method == "local":
-            port = int(sys.argv[2]) if len(sys.argv) > 2 else 8080
-            deploy_local(port)
-        elif method == "surge":
-            deploy_to_surge()
-        elif method == "firebase":
-            deploy_to_firebase()
-        elif method == "render":
-            deploy_to_render()
-        else:
-            print("❌ Unknown deployment method")
-            print("Usage: python simple-deploy.py [local|surge|firebase|render] [port]")
+DEPLOY_METHODS = ("local", "surge", "firebase", "render", "precompress")
+
+def main():
+    parser = argparse.ArgumentParser(description="Climate Risk Analysis deployment tool")
+    parser.add_argument("method", nargs="?", type=str.lower, choices=DEPLOY_METHODS,
+                        help="where to deploy (default: print the methods and start a local server)")
+    parser.add_argument("port", nargs="?", type=int, default=8080, help="local server port (default: 8080)")
+    parser.add_argument("--server", choices=SERVER_MODES, default="threaded",
+                        help="local server mode (default: threaded, HTTP/1.1 keep-alive)")
+    args = parser.parse_args()
+    if not 0 <= args.port <= 65535:
+        parser.error(f"port {args.port} is out of range")
+    
+    if args.method == "local":
+        deploy_local(args.port, args.server)
+    elif args.method == "surge":
+        deploy_to_surge()
+    elif args.method == "firebase":
+        deploy_to_firebase()
+    elif args.method == "render":
+        deploy_to_render()
+    elif args.method == "precompress":
+        precompress_assets()
     else:
         print("🚀 Climate Risk Analysis Deployment Tool")
         print("\nAvailable deployment methods:")
         print("  local [port]  - Local development server (default: 8080)")
+        print("                  --server threaded|single (default: threaded, HTTP/1.1 keep-alive)")
         print("  surge         - Deploy to Surge.sh (free)")
         print("  firebase      - Deploy to Firebase Hosting")
         print("  render        - Deploy to Render")
+        print("  precompress   - Write .gz/.br siblings for text assets in public/")
         print("\nExample: python simple-deploy.py local 3000")
         
         # Default to local deployment
-        deploy_local()
\ No newline at end of file
+        deploy_local(args.port, args.server)
+
+if __name__ == "__main__":
+    main()
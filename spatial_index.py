@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Uniform lat/lon grid index over property coordinates
+Prunes property-storm pairs to those within reach of a track point before
+damage is evaluated
+"""
+
+import numpy as np
+
+EARTH_RADIUS_NM = 3440.065
+
+DEFAULT_CELL_DEG = 1.0
+
+def haversine_nm(lat1, lon1, lat2, lon2):
+    """Great-circle distance in nautical miles; inputs in radians, broadcastable"""
+    a = (np.sin((lat2 - lat1) * 0.5) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) * 0.5) ** 2)
+    return 2.0 * EARTH_RADIUS_NM * np.arcsin(np.sqrt(a))
+
+class GridIndex:
+    """Properties bucketed into square lat/lon cells, sorted by cell key
+
+    Cells of one grid row are contiguous in key order, so the cells covering
+    a query box are found with one pair of binary searches per row.
+    Longitudes are not wrapped at the antimeridian.
+    """
+
+    def __init__(self, lat, lon, cell_deg=DEFAULT_CELL_DEG):
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        self.lat = lat
+        self.lon = lon
+        self.cell_deg = cell_deg
+        self.lat0 = lat.min() if len(lat) else 0.0
+        self.lon0 = lon.min() if len(lon) else 0.0
+
+        rows = self._cell(lat, self.lat0)
+        cols = self._cell(lon, self.lon0)
+        self.n_rows = int(rows.max()) + 1 if len(rows) else 0
+        self.n_cols = int(cols.max()) + 1 if len(cols) else 0
+
+        keys = rows * self.n_cols + cols
+        self.order = np.argsort(keys, kind="stable")
+        self.keys = keys[self.order]
+
+    def __len__(self):
+        return len(self.lat)
+
+    def _cell(self, values, origin):
+        return np.floor((values - origin) / self.cell_deg).astype(np.int64)
+
+    def query_pairs(self, lat, lon, reach_nm):
+        """Candidate (property, point) index pairs for many query points
+
+        A property is a candidate for a point when it falls in a grid cell
+        overlapping the point's reach box, the lat/lon bounding box of the
+        great circle of radius reach_nm. Candidates are a superset of the
+        properties within reach_nm (on the haversine sphere, short of the
+        antimeridian); callers filter on exact distance.
+        """
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        reach_nm = np.broadcast_to(np.asarray(reach_nm, dtype=float), lat.shape)
+        empty = np.empty(0, dtype=np.int64)
+        if len(self) == 0 or lat.size == 0:
+            return empty, empty
+
+        # Angular reach d. The widest longitude offset on a circle of radius
+        # d around latitude phi is arcsin(sin d / cos phi) (dividing dlat by
+        # cos phi underestimates it at high latitude); once the circle
+        # reaches a pole it spans every longitude.
+        reach = np.minimum(reach_nm / EARTH_RADIUS_NM, np.pi / 2)
+        dlat = np.degrees(reach)
+        ratio = np.sin(reach) / np.maximum(np.cos(np.radians(lat)), 1e-12)
+        dlon = np.where(ratio < 1.0, np.degrees(np.arcsin(np.minimum(ratio, 1.0))), 360.0)
+
+        r0 = self._cell(lat - dlat, self.lat0)
+        r1 = self._cell(lat + dlat, self.lat0)
+        c0 = np.maximum(self._cell(lon - dlon, self.lon0), 0)
+        c1 = np.minimum(self._cell(lon + dlon, self.lon0), self.n_cols - 1)
+
+        # Drop points whose box misses the grid entirely
+        hit = (r1 >= 0) & (r0 < self.n_rows) & (c1 >= c0)
+        points = np.flatnonzero(hit)
+        r0 = np.maximum(r0[hit], 0)
+        r1 = np.minimum(r1[hit], self.n_rows - 1)
+        c0 = c0[hit]
+        c1 = c1[hit]
+        if len(points) == 0:
+            return empty, empty
+
+        # One contiguous key range per (point, row)
+        starts, stops, owners = [], [], []
+        for offset in range(int((r1 - r0).max()) + 1):
+            row = r0 + offset
+            valid = row <= r1
+            row_key = row[valid] * self.n_cols
+            starts.append(np.searchsorted(self.keys, row_key + c0[valid], side="left"))
+            stops.append(np.searchsorted(self.keys, row_key + c1[valid], side="right"))
+            owners.append(points[valid])
+
+        starts = np.concatenate(starts)
+        counts = np.concatenate(stops) - starts
+        owners = np.concatenate(owners)
+
+        # Expand the ranges into explicit pairs
+        total = int(counts.sum())
+        range_start = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+        positions = range_start + np.arange(total)
+        return self.order[positions], np.repeat(owners, counts)
+
+    def query(self, lat, lon, reach_nm):
+        """Indices of properties within reach_nm of a single point"""
+        candidates, _ = self.query_pairs([lat], [lon], [reach_nm])
+        distance = haversine_nm(np.radians(lat), np.radians(lon),
+                                np.radians(self.lat[candidates]), np.radians(self.lon[candidates]))
+        return np.sort(candidates[distance <= reach_nm])
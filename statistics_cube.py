@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Scenario statistics cube build stage
+Precomputes scenario x decade x metric summaries into one small file so the
+comparison panel in climate-scenarios.html is a constant-time lookup
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+
+import atomic_files
+import exposure_engine
+import scenario_data
+import storm_synthesis
+
+CUBE_PATH = Path("public/data/scenario-cube.json")
+CUBE_FORMAT = 1
+
+STAT_METRICS = ("storms_per_year", "major_hurricanes", "avg_wind")
+LOSS_METRICS = ("expected_loss",) + tuple(f"exposure_{tier.lower()}" for tier in exposure_engine.TIERS)
+METRICS = STAT_METRICS + LOSS_METRICS
+
+DEFAULT_STORMS = 1000
+
+def build_cube(scenarios, portfolio, n_storms=DEFAULT_STORMS, seed=0):
+    """Dense (scenario, decade, metric) array plus its axis labels
+
+    Loss metrics come from the exposure engine run against a synthetic
+    ensemble per cell (or the cell's sample storms when n_storms is 0).
+    Exposure metrics are the portfolio value in each risk tier.
+    """
+    names = list(scenarios)
+    decades = sorted({d for entry in scenarios.values() for d in entry if d != "name"})
+    cube = np.full((len(names), len(decades), len(METRICS)), np.nan)
+
+    for s, scenario in enumerate(names):
+        for d, decade in enumerate(decades):
+            stats = scenarios[scenario].get(decade)
+            if stats is None:
+                continue
+            for m, metric in enumerate(STAT_METRICS):
+                cube[s, d, m] = stats[metric]
+
+            if n_storms:
+                rng = storm_synthesis.ensemble_rng(seed, scenario, decade)
+                ensemble = storm_synthesis.synthesize_storms(stats["avg_wind"], n_storms, rng)
+            else:
+                ensemble = storm_synthesis.from_sample_storms(stats["sample_storms"])
+
+            result = exposure_engine.assess_exposure(
+                portfolio, ensemble, stats["storms_per_year"], index=True
+            )
+            summary = exposure_engine.summarize(portfolio, result)
+            cube[s, d, METRICS.index("expected_loss")] = summary["expected_annual_loss"]
+            for tier, entry in summary["tiers"].items():
+                cube[s, d, METRICS.index(f"exposure_{tier.lower()}")] = entry["value"]
+
+    return cube, names, decades
+
+def write_cube(cube, names, decades, scenarios, path=CUBE_PATH):
+    """Publish the cube as flat row-major values with its axis labels"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {
+        "format": CUBE_FORMAT,
+        "scenarios": names,
+        "names": {scenario: scenarios[scenario]["name"] for scenario in names},
+        "decades": decades,
+        "metrics": list(METRICS),
+        # values[(s * len(decades) + d) * len(metrics) + m]; null for missing cells
+        "values": [None if np.isnan(v) else round(float(v), 2) for v in cube.ravel()],
+    }
+    return atomic_files.write_text(path, json.dumps(payload, separators=(",", ":")))
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute the scenario statistics cube")
+    parser.add_argument("--portfolio", help="CSV/JSON portfolio or store directory (default: climate-scenarios.html properties)")
+    parser.add_argument("--storms", type=int, default=DEFAULT_STORMS,
+                        help="synthetic storms per cell (0 = the page's sample storms)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=str(CUBE_PATH))
+    args = parser.parse_args()
+
+    scenarios = scenario_data.load_scenarios()
+    portfolio = exposure_engine.load_portfolio(args.portfolio)
+
+    print(f"🧊 Building statistics cube ({len(portfolio['lat']):,} properties, "
+          f"{args.storms:,} storms per cell)...")
+    cube, names, decades = build_cube(scenarios, portfolio, args.storms, args.seed)
+    path = write_cube(cube, names, decades, scenarios, args.out)
+    print(f"✅ {path} ({path.stat().st_size:,} bytes, "
+          f"{len(names)} scenarios x {len(decades)} decades x {len(METRICS)} metrics)")
+
+if __name__ == "__main__":
+    main()
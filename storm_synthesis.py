@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Synthetic storm-track ensembles for the climate scenario datasets
+Generates whole ensembles as NumPy arrays in one batched call per scenario/decade
+"""
+
+import argparse
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+import scenario_data
+
+# Genesis region (degrees) for Atlantic storms reaching the Caribbean/Gulf
+GENESIS_LAT = (15.0, 25.0)
+GENESIS_LON = (-85.0, -65.0)
+
+# Track shape: each step moves north-east and loses a fixed share of peak wind
+TRACK_POINTS = 10
+LAT_STEP = 0.5
+LON_STEP = 0.3
+WIND_DECAY = 0.08
+
+# Peak wind is drawn around the scenario's avg_wind (mph)
+WIND_SPREAD = 15.0
+MIN_WIND = 39.0
+MAX_WIND = 190.0
+
+# Wind field radius grows with storm strength (nautical miles)
+BASE_RADIUS_NM = 20.0
+RADIUS_PER_MPH = 0.1
+
+def ensemble_rng(seed, scenario, decade):
+    """Independent, reproducible generator for one scenario/decade"""
+    key = zlib.crc32(f"{scenario}/{decade}".encode())
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(key,)))
+
+def synthesize_storms(avg_wind, n_storms, rng, n_points=TRACK_POINTS):
+    """Generate n_storms tracks in one vectorized pass
+
+    Returns a dict of arrays: max_wind is (n_storms,), the track columns
+    lat/lon/wind_mph/radius_nm are (n_storms, n_points).
+    """
+    lat0 = rng.uniform(*GENESIS_LAT, size=n_storms)
+    lon0 = rng.uniform(*GENESIS_LON, size=n_storms)
+    max_wind = np.clip(rng.normal(avg_wind, WIND_SPREAD, size=n_storms), MIN_WIND, MAX_WIND)
+    return storm_tracks(lat0, lon0, max_wind, n_points)
+
+def storm_tracks(lat0, lon0, max_wind, n_points=TRACK_POINTS):
+    """Build track arrays from genesis points and peak winds (same shapes as above)"""
+    steps = np.arange(n_points)
+    radius = BASE_RADIUS_NM + max_wind * RADIUS_PER_MPH
+    return {
+        "max_wind": max_wind,
+        "lat": lat0[:, None] + LAT_STEP * steps,
+        "lon": lon0[:, None] + LON_STEP * steps,
+        # Linear decay reaches zero after 1 / WIND_DECAY steps; longer
+        # tracks (--points) hold at 0 rather than going negative
+        "wind_mph": max_wind[:, None] * np.maximum(1.0 - WIND_DECAY * steps, 0.0),
+        "radius_nm": np.repeat(radius[:, None], n_points, axis=1),
+    }
+
+def synthesize_scenarios(index, n_storms, seed=0, n_points=TRACK_POINTS):
+    """Generate an ensemble for every scenario/decade in a stats index
+
+    index has the shape of the inline scenarios object: scenario -> decade ->
+    {storms_per_year, major_hurricanes, avg_wind}.
+    """
+    ensembles = {}
+    for scenario, entry in index.items():
+        for decade, stats in entry.items():
+            if decade == "name":
+                continue
+            rng = ensemble_rng(seed, scenario, decade)
+            ensembles[(scenario, decade)] = synthesize_storms(
+                stats["avg_wind"], n_storms, rng, n_points
+            )
+    return ensembles
+
+def to_sample_storms(ensemble, limit=None):
+    """Convert an ensemble into the sample_storms list drawStorms consumes"""
+    count = len(ensemble["max_wind"]) if limit is None else limit
+    columns = {field: ensemble[field][:count].tolist()
+               for field in scenario_data.COLUMNS}
+    storms = []
+    for i, max_wind in enumerate(ensemble["max_wind"][:count].tolist()):
+        track = [dict(zip(columns, point))
+                 for point in zip(*(columns[field][i] for field in columns))]
+        storms.append({"name": f"Storm_{i + 1}", "track": track, "max_wind": max_wind})
+    return storms
+
+def from_sample_storms(storms):
+    """Convert a sample_storms list back into ensemble arrays
+
+    Shorter tracks are padded by repeating their last point, which leaves
+    per-storm minima and maxima unchanged.
+    """
+    n_points = max(len(storm["track"]) for storm in storms)
+    ensemble = {"max_wind": np.array([storm["max_wind"] for storm in storms], dtype=float)}
+    for field in scenario_data.COLUMNS:
+        rows = [[point[field] for point in storm["track"]] for storm in storms]
+        ensemble[field] = np.array([row + row[-1:] * (n_points - len(row)) for row in rows])
+    return ensemble
+
+def save_ensemble(path, ensemble):
+    """Save an ensemble as an .npz archive for analysis stages"""
+    np.savez_compressed(path, **ensemble)
+
+def load_ensemble(path):
+    with np.load(path) as archive:
+        return {name: archive[name] for name in archive.files}
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic storm ensembles")
+    parser.add_argument("--storms", type=int, default=5, help="storms per scenario/decade")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--points", type=int, default=TRACK_POINTS, help="track points per storm")
+    parser.add_argument("--write-slices", action="store_true",
+                        help="replace the page's scenario slices with the new tracks")
+    parser.add_argument("--out", help="directory for .npz ensembles")
+    args = parser.parse_args()
+
+    index = scenario_data.load_inline_scenarios()
+    print(f"🌀 Synthesizing {args.storms:,} storms per scenario/decade (seed {args.seed})...")
+    ensembles = synthesize_scenarios(index, args.storms, args.seed, args.points)
+
+    if args.out:
+        out_dir = Path(args.out)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        for (scenario, decade), ensemble in ensembles.items():
+            path = out_dir / f"{scenario}-{decade}.npz"
+            save_ensemble(path, ensemble)
+            print(f"💾 {path}")
+
+    if args.write_slices:
+        for (scenario, decade), ensemble in ensembles.items():
+            path = scenario_data.write_slice(scenario, decade, to_sample_storms(ensemble))
+            print(f"📦 {path}")
+
+    print("✅ Storm synthesis complete")
+
+if __name__ == "__main__":
+    main()
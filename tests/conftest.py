@@ -0,0 +1,35 @@
+"""
+Shared fixtures: the repo root on sys.path and loaders for the hyphenated
+scripts, which are not importable by name
+"""
+
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+def load_script(filename):
+    """Import a hyphenated script, registered in sys.modules like bench_build does"""
+    name = filename.removesuffix(".py").replace("-", "_")
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.spec_from_file_location(name, REPO_ROOT / filename)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+@pytest.fixture
+def simple_deploy(monkeypatch):
+    # ROUTES and the handler serve "public" relative to the working directory
+    monkeypatch.chdir(REPO_ROOT)
+    return load_script("simple-deploy.py")
+
+@pytest.fixture
+def github_pages():
+    pytest.importorskip("requests")
+    return load_script("setup-github-pages.py")
@@ -0,0 +1,35 @@
+"""Atomic file and directory replacement"""
+
+import pytest
+
+import atomic_files
+
+def test_replace_dir_swaps_in_new_tree(tmp_path):
+    dest = tmp_path / "out"
+    (dest / "old").mkdir(parents=True)
+    (dest / "old" / "a.json").write_text("old")
+    new = tmp_path / ".out.tmp"
+    new.mkdir()
+    (new / "b.json").write_text("new")
+
+    assert atomic_files.replace_dir(new, dest) == dest
+    assert sorted(p.name for p in dest.iterdir()) == ["b.json"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["out"]
+
+def test_replace_dir_keeps_old_tree_when_move_fails(tmp_path):
+    dest = tmp_path / "out"
+    dest.mkdir()
+    (dest / "a.json").write_text("old")
+
+    with pytest.raises(OSError):
+        atomic_files.replace_dir(tmp_path / "missing", dest)
+    assert (dest / "a.json").read_text() == "old"
+    assert not (tmp_path / ".out.old").exists()
+
+def test_write_text_leaves_no_temp_file_on_error(tmp_path):
+    dest = tmp_path / "report.json"
+    dest.write_text("old")
+    with pytest.raises(TypeError):
+        atomic_files.write_text(dest, None)
+    assert dest.read_text() == "old"
+    assert [p.name for p in tmp_path.iterdir()] == ["report.json"]
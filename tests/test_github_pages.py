@@ -0,0 +1,194 @@
+"""batch_deploy and the Contents API fallback against an in-memory GitHub mock"""
+
+import base64
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+import pytest
+
+PREFIX = "/repos/owner/site"
+
+class MockGitHub:
+    """Just enough of the Git Data and Contents APIs for one branch
+
+    ref_status 404 is a missing branch, 409 an empty repository.
+    """
+
+    def __init__(self, files=None, ref_status=200, truncated=False):
+        self.ref_status = ref_status
+        self.truncated = truncated
+        self.calls = []
+        self.trees = {}
+        self.commits = {}
+        self.head = None
+        self.contents = {}
+        if ref_status == 200:
+            tree = self.add_tree(dict(files or {}))
+            self.head = self.add_commit(tree)
+
+    def add_tree(self, files):
+        sha = hashlib.sha1(json.dumps(sorted(files.items())).encode()).hexdigest()
+        self.trees[sha] = files
+        return sha
+
+    def add_commit(self, tree):
+        sha = hashlib.sha1(f"{tree}{len(self.commits)}".encode()).hexdigest()
+        self.commits[sha] = tree
+        return sha
+
+    def files(self):
+        return self.trees[self.commits[self.head]] if self.head else {}
+
+    def paths(self, method):
+        return [path for m, path, _ in self.calls if m == method]
+
+    def body(self, method, path):
+        return next(body for m, p, body in self.calls if m == method and p == path)
+
+    def handle(self, method, path, body):
+        self.calls.append((method, path, body))
+        url = urlsplit(path)
+        route = unquote(url.path).removeprefix(PREFIX)
+        if method == "GET" and route == "/git/ref/heads/main":
+            if self.head is None:
+                return self.ref_status, {"message": "Not Found"}
+            return 200, {"object": {"sha": self.head}}
+        if method == "GET" and route.startswith("/git/commits/"):
+            return 200, {"tree": {"sha": self.commits[route.rsplit("/", 1)[1]]}}
+        if method == "GET" and route.startswith("/git/trees/"):
+            files = self.trees[route.rsplit("/", 1)[1]]
+            listing = [] if self.truncated else [
+                {"path": p, "type": "blob", "sha": sha} for p, sha in files.items()
+            ]
+            return 200, {"tree": listing, "truncated": self.truncated}
+        if method == "GET" and route.startswith("/contents/"):
+            sha = self.files().get(route.removeprefix("/contents/"))
+            return (200, {"type": "file", "sha": sha}) if sha else (404, {"message": "Not Found"})
+        if method == "POST" and route == "/git/trees":
+            files = dict(self.trees[body["base_tree"]]) if "base_tree" in body else {}
+            for entry in body["tree"]:
+                files[entry["path"]] = entry.get("sha") or git_sha(entry["content"].encode())
+            return 201, {"sha": self.add_tree(files)}
+        if method == "POST" and route == "/git/blobs":
+            return 201, {"sha": git_sha(base64.b64decode(body["content"]))}
+        if method == "POST" and route == "/git/commits":
+            return 201, {"sha": self.add_commit(body["tree"])}
+        if (method, route) in (("PATCH", "/git/refs/heads/main"), ("POST", "/git/refs")):
+            self.head = body["sha"]
+            return 200, {"object": {"sha": body["sha"]}}
+        if method == "PUT" and route.startswith("/contents/"):
+            self.contents[route.removeprefix("/contents/")] = body
+            return 201, {"content": {}}
+        return 404, {"message": f"unexpected {method} {route}"}
+
+def git_sha(content):
+    return hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+
+@pytest.fixture
+def serve(monkeypatch, tmp_path, github_pages):
+    monkeypatch.setenv("DEPLOY_METRICS_DIR", str(tmp_path / "metrics"))
+    servers = []
+
+    def start(mock):
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def respond(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length)) if length else None
+                status, reply = mock.handle(self.command, self.path, body)
+                data = json.dumps(reply).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PATCH = do_PUT = respond
+
+        httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        servers.append(httpd)
+        return github_pages.GitHubPagesSetup(
+            "token", owner="owner", repo="site",
+            base_url=f"http://127.0.0.1:{httpd.server_address[1]}",
+        )
+
+    yield start
+    for httpd in servers:
+        httpd.shutdown()
+        httpd.server_close()
+
+@pytest.fixture
+def public(tmp_path):
+    public = tmp_path / "public"
+    (public / "data").mkdir(parents=True)
+    (public / "index.html").write_text('<a href="/data/storms.json">storms</a>')
+    (public / "data" / "storms.json").write_text('{"storms": []}')
+    (public / "logo.png").write_bytes(b"\x89PNG\xff\xfe")
+    return public
+
+def test_batch_deploy_commits_on_top_of_head(serve, public):
+    mock = MockGitHub({"data/storms.json": git_sha(b'{"storms": []}'), "CNAME": "cname"})
+    old_head = mock.head
+    pages = serve(mock)
+
+    new_head = pages.batch_deploy(public)
+
+    assert new_head == mock.head != old_head
+    tree = mock.body("POST", f"{PREFIX}/git/trees")
+    assert tree["base_tree"] == mock.commits[old_head]
+    # Unchanged files stay out; the binary one goes up as a blob
+    assert sorted(entry["path"] for entry in tree["tree"]) == ["index.html", "logo.png"]
+    assert mock.paths("POST").count(f"{PREFIX}/git/blobs") == 1
+    assert mock.body("POST", f"{PREFIX}/git/commits")["parents"] == [old_head]
+    assert mock.body("PATCH", f"{PREFIX}/git/refs/heads/main") == {"sha": new_head, "force": False}
+    assert mock.files()["CNAME"] == "cname"
+    assert mock.files()["index.html"] == git_sha(b'<a href="./data/storms.json">storms</a>')
+
+    # A second deploy finds nothing to change and writes nothing
+    mock.calls.clear()
+    assert pages.batch_deploy(public) == new_head
+    assert all(method == "GET" for method, _, _ in mock.calls)
+
+def test_batch_deploy_creates_missing_branch(serve, public):
+    mock = MockGitHub(ref_status=404)
+    pages = serve(mock)
+
+    new_head = pages.batch_deploy(public)
+
+    assert "base_tree" not in mock.body("POST", f"{PREFIX}/git/trees")
+    assert mock.body("POST", f"{PREFIX}/git/commits")["parents"] == []
+    assert mock.body("POST", f"{PREFIX}/git/refs") == {"ref": "refs/heads/main", "sha": new_head}
+    assert mock.paths("PATCH") == []
+    assert sorted(mock.files()) == ["data/storms.json", "index.html", "logo.png"]
+
+def test_batch_deploy_falls_back_to_contents_api_for_empty_repo(serve, public):
+    mock = MockGitHub(ref_status=409)
+    pages = serve(mock)
+
+    assert pages.batch_deploy(public) is None
+
+    assert sorted(mock.contents) == ["data/storms.json", "index.html", "logo.png"]
+    assert all("sha" not in body for body in mock.contents.values())
+    assert not any("/git/" in path for path in mock.paths("POST"))
+
+def test_truncated_tree_looks_up_files_one_by_one(serve, public):
+    mock = MockGitHub({
+        "data/storms.json": git_sha(b'{"storms": []}'),
+        "logo.png": "stale",
+    }, truncated=True)
+    pages = serve(mock)
+
+    pages.update_repository_files(public)
+
+    lookups = sorted(path.split("?")[0] for path in mock.paths("GET") if "/contents/" in path)
+    assert lookups == [f"{PREFIX}/contents/{p}" for p in ("data/storms.json", "index.html", "logo.png")]
+    # storms.json matches and is skipped; logo.png is updated in place
+    assert sorted(mock.contents) == ["index.html", "logo.png"]
+    assert mock.contents["logo.png"]["sha"] == "stale"
+    assert "sha" not in mock.contents["index.html"]
@@ -0,0 +1,62 @@
+"""Delta weight updates in HazardScorer agree with full recomputes"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import hazard_scoring
+
+HAZARDS = {
+    "hurricane": {"current": 8.5, "projected": 9.2, "weight": 0.3},
+    "flood": {"current": 7.2, "projected": 8.1, "weight": 0.25},
+    "heat": {"current": 6.8, "projected": 8.9, "weight": 0.2},
+    "drought": {"current": 4.1, "projected": 5.6, "weight": 0.15},
+    "wildfire": {"current": 2.3, "projected": 3.4, "weight": 0.1},
+}
+
+@pytest.fixture
+def matrix():
+    return np.random.default_rng(7).uniform(0, 100, (500, len(HAZARDS)))
+
+def assert_same_scores(scorer, reference):
+    np.testing.assert_allclose(scorer.scores(), reference.scores(), rtol=1e-5, atol=1e-4)
+    for confidence in hazard_scoring.CONFIDENCE_LEVELS:
+        np.testing.assert_allclose(scorer.scores(confidence), reference.scores(confidence),
+                                   rtol=1e-5, atol=1e-4)
+
+def test_set_weight_matches_recompute(matrix):
+    scorer = hazard_scoring.HazardScorer(matrix, HAZARDS)
+    reference = hazard_scoring.HazardScorer(matrix, HAZARDS)
+    rng = np.random.default_rng(11)
+    # Enough updates to pass REFRESH_EVERY more than once
+    for step in range(3 * hazard_scoring.REFRESH_EVERY + 5):
+        scorer.set_weight(int(rng.integers(len(HAZARDS))), float(rng.uniform(0, 2)))
+        if step % 17 == 0:
+            reference.set_weights(scorer.weights)
+            assert_same_scores(scorer, reference)
+    reference.set_weights(scorer.weights)
+    assert_same_scores(scorer, reference)
+
+    composite, upper = scorer.table(scorer.weights)[hazard_scoring.HORIZONS[-1]]
+    np.testing.assert_allclose(scorer.scores(), composite, rtol=1e-5, atol=1e-4)
+    np.testing.assert_allclose(scorer.scores(95), upper[95], rtol=1e-5, atol=1e-4)
+
+def test_set_weight_by_name_after_horizon_change(matrix):
+    scorer = hazard_scoring.HazardScorer(matrix, HAZARDS)
+    scorer.set_horizon(2030)
+    scorer.set_weight("flood", 3.0)
+    scorer.set_weight("heat", 0.0)
+
+    reference = hazard_scoring.HazardScorer(matrix, HAZARDS)
+    reference.set_horizon(2030)
+    reference.set_weights([0.2, 3.0, 0.0, 0.2, 0.2])
+    assert_same_scores(scorer, reference)
+
+def test_all_zero_weights_score_zero(matrix):
+    scorer = hazard_scoring.HazardScorer(matrix, HAZARDS)
+    for hazard in HAZARDS:
+        scorer.set_weight(hazard, 0.0)
+    assert not scorer.scores().any()
+    assert not scorer.scores(99).any()
+    composite, upper = scorer.table(scorer.weights)[hazard_scoring.HORIZONS[-1]]
+    assert not composite.any() and not upper[99].any()
@@ -0,0 +1,49 @@
+"""LinkRewriter in deploy-to-main-domain.py"""
+
+import io
+import re
+
+import pytest
+
+from conftest import load_script
+
+def chained(content, html):
+    """The rule-by-rule passes of the original fix_localhost_links"""
+    content = re.sub(r'http://localhost:\d+/', '', content)
+    content = re.sub(r'https://localhost:\d+/', '', content)
+    for port in ('8080', '3000', '8000'):
+        content = content.replace(f'localhost:{port}', 'johnnycchung.com')
+    if html:
+        content = re.sub(r'href="\./', 'href="', content)
+        content = re.sub(r'src="\./', 'src="', content)
+        content = re.sub(r'href="/', 'href="', content)
+        content = re.sub(r'src="/', 'src="', content)
+    return content
+
+@pytest.fixture
+def rewriter():
+    return load_script("deploy-to-main-domain.py").LinkRewriter("johnnycchung.com")
+
+@pytest.mark.parametrize("text", [
+    '<script src=".//js/app.js"></script>',
+    '<a href="http://localhost:8080//climate-scenarios.html">',
+    '<a href="./http://localhost:3000/x">',
+    '<img src="/./logo.png"> <a href="././x">',
+    'fetch("http://localhost:8000/api") // localhost:3000 and localhost:9999',
+    '<a href="https://localhost:443/http://localhost:8080/./x">',
+])
+def test_matches_chained_passes_on_link_chains(rewriter, text):
+    for html in (True, False):
+        assert rewriter.rewrite(text, html)[0] == chained(text, html)
+
+def test_rewritten_text_is_not_matched_again(rewriter):
+    # The old passes re-scanned the spliced 'href="/'; one pass does not
+    text = 'hrefhttp://localhost:1/="/x"'
+    assert rewriter.rewrite(text, html=True)[0] == 'href="/x"'
+    assert chained(text, html=True) == 'href="x"'
+
+def test_stream_matches_whole_string(rewriter):
+    text = '<a href="./x">http://localhost:8080/y src=".//z"\n' * 5000
+    out = io.StringIO()
+    count = rewriter.rewrite_stream(io.StringIO(text), out, html=True, chunk_size=997)
+    assert (out.getvalue(), count) == rewriter.rewrite(text, html=True)
@@ -0,0 +1,57 @@
+"""POST /api/score against a live threaded server"""
+
+import http.client
+import json
+import threading
+
+import pytest
+
+pytest.importorskip("numpy")
+
+PORTFOLIO = b"id,lat,lon,value,construction\nA,25.76,-80.19,500000,wood\nB,27.95,-82.46,750000,concrete\n"
+
+@pytest.fixture
+def server(simple_deploy):
+    simple_deploy.SCORER = simple_deploy.PortfolioScorer(workers=2)
+    httpd = simple_deploy.create_server(0)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd.server_address[1]
+    httpd.shutdown()
+    httpd.server_close()
+    if simple_deploy.SCORER._executor is not None:
+        simple_deploy.SCORER._executor.shutdown()
+
+def post(conn, body, content_type="text/csv", query="storms=50&seed=1"):
+    conn.request("POST", f"/api/score?{query}", body=body, headers={"Content-Type": content_type})
+    response = conn.getresponse()
+    return response, response.read()
+
+def test_consecutive_requests_and_cache_hit(server):
+    conn = http.client.HTTPConnection("localhost", server, timeout=120)
+    
+    first, body = post(conn, PORTFOLIO)
+    assert first.status == 200, body
+    assert first.getheader("X-Score-Cache") == "miss"
+    result = json.loads(body)
+    assert [row["id"] for row in result["results"]] == ["A", "B"]
+    
+    repeat, repeat_body = post(conn, PORTFOLIO)
+    assert repeat.status == 200, repeat_body
+    assert repeat.getheader("X-Score-Cache") == "hit"
+    assert json.loads(repeat_body) == result
+    
+    # A different portfolio after the pool exists is scored, not a 500
+    records = json.dumps([{"id": "C", "lat": 29.95, "lon": -90.07}]).encode()
+    other, other_body = post(conn, records, "application/json")
+    assert other.status == 200, other_body
+    assert other.getheader("X-Score-Cache") == "miss"
+
+def test_invalid_portfolios_are_400_after_first_job(server):
+    conn = http.client.HTTPConnection("localhost", server, timeout=120)
+    assert post(conn, PORTFOLIO)[0].status == 200
+    
+    bad_lat, body = post(conn, b"id,lat,lon\nX,123,-80\n")
+    assert bad_lat.status == 400 and b"X" in body
+    empty, _ = post(conn, b"[]", "application/json")
+    assert empty.status == 400
@@ -0,0 +1,27 @@
+"""Season reports do not depend on the worker count"""
+
+import pytest
+
+pytest.importorskip("numpy")
+
+import exposure_engine
+import season_simulator
+
+STATS = {"storms_per_year": 14, "major_hurricanes": 3, "avg_wind": 105}
+
+def report(portfolio, workers):
+    # 450 seasons in chunks of 100: an uneven last chunk, more chunks than workers
+    summary = season_simulator.simulate_seasons(portfolio, STATS, 450, seed=3, workers=workers,
+                                                chunk_seasons=100)
+    return season_simulator.build_report(summary, "baseline", "2020s", 3, 100)
+
+def test_pool_matches_serial():
+    portfolio = exposure_engine.make_portfolio([
+        {"id": "A", "lat": 25.76, "lon": -80.19},
+        {"id": "B", "lat": 27.95, "lon": -82.46, "value": 750000, "construction": "concrete"},
+        {"id": "C", "lat": 29.95, "lon": -90.07, "value": 300000, "construction": "wood"},
+    ])
+    serial = report(portfolio, workers=1)
+    assert serial["seasons"] == 450
+    assert serial["aal"] > 0
+    assert report(portfolio, workers=3) == serial
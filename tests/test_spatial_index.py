@@ -0,0 +1,44 @@
+"""GridIndex candidate pruning and the indexed exposure path"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import exposure_engine
+import storm_synthesis
+from spatial_index import GridIndex, haversine_nm
+
+def brute_force(lat, lon, point_lat, point_lon, reach_nm):
+    distance = haversine_nm(np.radians(lat), np.radians(lon), np.radians(point_lat), np.radians(point_lon))
+    return np.flatnonzero(distance <= reach_nm)
+
+@pytest.mark.parametrize("lat_range, max_reach", [((20.0, 35.0), 300.0), ((55.0, 70.0), 600.0), ((80.0, 89.0), 900.0)])
+def test_query_finds_every_property_in_reach(lat_range, max_reach):
+    rng = np.random.default_rng(7)
+    lat = rng.uniform(lat_range[0] - 10, min(lat_range[1] + 10, 89.9), 5000)
+    lon = rng.uniform(-60.0, 60.0, 5000)
+    index = GridIndex(lat, lon)
+
+    for _ in range(300):
+        point_lat = rng.uniform(*lat_range)
+        point_lon = rng.uniform(-40.0, 40.0)
+        reach = rng.uniform(10.0, max_reach)
+        expected = brute_force(lat, lon, point_lat, point_lon, reach)
+        np.testing.assert_array_equal(index.query(point_lat, point_lon, reach), expected)
+
+def test_indexed_exposure_matches_dense():
+    rng = np.random.default_rng(3)
+    portfolio = exposure_engine.make_portfolio([
+        {"id": f"P{i}", "lat": lat, "lon": lon, "value": value, "construction": kind}
+        for i, (lat, lon, value, kind) in enumerate(zip(
+            rng.uniform(18.0, 45.0, 400), rng.uniform(-98.0, -60.0, 400),
+            rng.uniform(1e5, 5e6, 400), rng.choice(exposure_engine.CONSTRUCTION_TYPES, 400)))
+    ])
+    ensemble = storm_synthesis.synthesize_storms(120.0, 200, rng)
+
+    dense = exposure_engine.assess_exposure(portfolio, ensemble, 15.0)
+    indexed = exposure_engine.assess_exposure(portfolio, ensemble, 15.0, index=True)
+    # The dense kernel works in float32
+    np.testing.assert_allclose(indexed["expected_loss"], dense["expected_loss"], rtol=1e-4, atol=1.0)
+    np.testing.assert_allclose(indexed["event_loss"], dense["event_loss"], rtol=1e-4, atol=1.0)
+    np.testing.assert_array_equal(indexed["tier"], dense["tier"])
@@ -0,0 +1,29 @@
+"""Static file serving helpers in simple-deploy.py"""
+
+import pytest
+
+@pytest.mark.parametrize("name, hashed", [
+    ("app.3f9a2c1d7e.js", True),
+    ("bundle.0123456789abcdef.css", True),
+    ("report.20261016.json", False),
+    ("tiles.1697500000.json", False),
+    ("cafe.deadbeefcafe.js", False),
+    ("app.3f9a2c1d.js", False),
+    ("climate-scenarios.html", False),
+])
+def test_hashed_asset(simple_deploy, name, hashed):
+    assert bool(simple_deploy.HASHED_ASSET.search(f"public/{name}")) == hashed
+
+def test_stage_public_leaves_out_precompressed_siblings(simple_deploy, tmp_path, monkeypatch):
+    public = tmp_path / "public"
+    (public / "data").mkdir(parents=True)
+    (public / "index.html").write_text("<html></html>")
+    (public / "index.html.gz").write_bytes(b"gz")
+    (public / "index.html.br").write_bytes(b"br")
+    (public / "data" / "tracks.gz").write_bytes(b"a real archive")
+    monkeypatch.chdir(tmp_path)
+
+    stage = simple_deploy.stage_public("surge", public)
+    assert sorted(p.relative_to(stage).as_posix() for p in stage.rglob("*") if p.is_file()) == [
+        "data/tracks.gz", "index.html",
+    ]